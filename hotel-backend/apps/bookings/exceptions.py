@@ -0,0 +1,9 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class BookingConflict(APIException):
+    """The requested nights were taken by a concurrent booking or block"""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'This room is no longer available for the selected dates.'
+    default_code = 'booking_conflict'
@@ -0,0 +1,99 @@
+from datetime import date, timedelta
+from apps.bookings.models import Booking, RoomNight
+from apps.rooms.models import RoomAvailability
+
+
+def nights_between(start: date, end: date):
+    """Every night from start up to (not including) end"""
+    if isinstance(start, str):
+        start = date.fromisoformat(start)
+    if isinstance(end, str):
+        end = date.fromisoformat(end)
+    return [start + timedelta(days=offset) for offset in range((end - start).days)]
+
+
+class InventoryService:
+    """
+    Keeps the RoomNight occupancy table in sync with bookings and blocks.
+
+    - Every booking that is not cancelled owns one row per night of the stay.
+    - Every admin block/maintenance period owns one row per night of
+      [start_date, end_date). Periods linked to a booking (the BUSY periods
+      auto-created for bookings) mirror that booking and own no rows; they
+      follow its room and dates, and are deleted once it is cancelled, so
+      readers of RoomAvailability agree with the RoomNight inventory.
+
+    Callers run inside the transaction of the save (Booking.save and
+    RoomAvailability.save are atomic), so a conflicting night raises
+    IntegrityError and rolls the whole change back.
+    """
+
+    @staticmethod
+    def sync_booking(booking):
+        wanted = set()
+        if booking.status != Booking.Status.CANCELLED:
+            wanted = set(nights_between(booking.check_in_date, booking.check_out_date))
+        InventoryService._sync(
+            RoomNight.objects.filter(booking=booking), wanted,
+            room_id=booking.room_id, booking=booking
+        )
+        InventoryService.sync_busy_periods(booking)
+
+    @staticmethod
+    def sync_busy_periods(booking):
+        periods = RoomAvailability.objects.filter(booking=booking)
+        if booking.status == Booking.Status.CANCELLED:
+            periods.delete()
+            return
+        moved = periods.exclude(
+            room_id=booking.room_id,
+            start_date=booking.check_in_date,
+            end_date=booking.check_out_date
+        )
+        for period in moved:
+            period.room_id = booking.room_id
+            period.start_date = booking.check_in_date
+            period.end_date = booking.check_out_date
+            period.save(update_fields=['room', 'start_date', 'end_date', 'updated_at'])
+
+    @staticmethod
+    def sync_availability_period(period):
+        wanted = set()
+        if period.booking_id is None:
+            wanted = set(nights_between(period.start_date, period.end_date))
+        InventoryService._sync(
+            RoomNight.objects.filter(availability_period=period), wanted,
+            room_id=period.room_id, availability_period=period
+        )
+
+    @staticmethod
+    def _sync(existing, wanted, room_id, **owner):
+        current = {night: (pk, row_room_id) for pk, row_room_id, night in existing.values_list('id', 'room_id', 'night')}
+
+        # Drop nights no longer covered (or left behind on another room)
+        stale = [pk for night, (pk, row_room_id) in current.items()
+                 if night not in wanted or row_room_id != room_id]
+        if stale:
+            RoomNight.objects.filter(id__in=stale).delete()
+
+        missing = [night for night in wanted
+                   if night not in current or current[night][1] != room_id]
+        if missing:
+            RoomNight.objects.bulk_create([
+                RoomNight(room_id=room_id, night=night, **owner)
+                for night in sorted(missing)
+            ])
+
+    @staticmethod
+    def is_available(room_id: int, check_in: date, check_out: date) -> bool:
+        """One indexed range probe on (room, night)"""
+        return not RoomNight.objects.filter(
+            room_id=room_id,
+            night__gte=check_in,
+            night__lt=check_out
+        ).exists()
+
+    @staticmethod
+    def occupied_nights(check_in: date, check_out: date):
+        """RoomNight rows in [check_in, check_out), for use as a subquery or range scan"""
+        return RoomNight.objects.filter(night__gte=check_in, night__lt=check_out)
@@ -0,0 +1,12 @@
+import threading
+
+# Striped per-room locks: requests for the same room queue up behind each
+# other inside this process while different rooms proceed in parallel.
+# Cross-process safety comes from the RoomNight unique constraint.
+_STRIPES = 64
+_room_locks = [threading.Lock() for _ in range(_STRIPES)]
+
+
+def room_lock(room_id: int):
+    """Lock guarding reservations for a room within this process"""
+    return _room_locks[int(room_id) % _STRIPES]
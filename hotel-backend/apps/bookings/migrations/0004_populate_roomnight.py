@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.db import migrations
+
+
+def populate_room_nights(apps, schema_editor):
+    """Materialize nights for existing bookings and admin blocks"""
+    Booking = apps.get_model('bookings', 'Booking')
+    RoomAvailability = apps.get_model('rooms', 'RoomAvailability')
+    RoomNight = apps.get_model('bookings', 'RoomNight')
+
+    def nights(start, end):
+        return [start + timedelta(days=offset) for offset in range((end - start).days)]
+
+    rows = []
+    for booking in Booking.objects.exclude(status='CANCELLED').order_by('created_at').iterator():
+        rows.extend(
+            RoomNight(room_id=booking.room_id, night=night, booking_id=booking.id)
+            for night in nights(booking.check_in_date, booking.check_out_date)
+        )
+    for period in RoomAvailability.objects.filter(booking__isnull=True).order_by('created_at').iterator():
+        rows.extend(
+            RoomNight(room_id=period.room_id, night=night, availability_period_id=period.id)
+            for night in nights(period.start_date, period.end_date)
+        )
+
+    # Existing data may already contain overlaps; the first claim on a night wins
+    RoomNight.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_roomnight'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_room_nights, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from apps.rooms.models import Room
@@ -75,6 +75,7 @@ class Booking(models.Model):
         indexes = [
             models.Index(fields=['check_in_date', 'check_out_date']),
             models.Index(fields=['status']),
+            models.Index(fields=['-created_at', '-id']),  # keyset pagination
         ]
 
     def clean(self):
@@ -90,6 +91,11 @@ class Booking(models.Model):
         if self.room and self.number_of_guests > self.room.capacity:
             raise ValidationError(f'Room capacity is {self.room.capacity} guests')
 
+    def save(self, *args, **kwargs):
+        # The RoomNight inventory is synced from post_save; keep it in this transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Booking #{self.id} - {self.room.name} ({self.check_in_date} to {self.check_out_date})"
 
@@ -97,3 +103,42 @@ class Booking(models.Model):
     def nights(self):
         """Calculate number of nights"""
         return (self.check_out_date - self.check_in_date).days
+
+
+class RoomNight(models.Model):
+    """
+    One occupied night of a room, materialized from bookings and admin blocks.
+
+    Rows are written in the same transaction as the Booking / RoomAvailability
+    they come from (see apps.bookings.inventory), and the unique (room, night)
+    constraint makes the database reject double-bookings.
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='room_nights')
+    night = models.DateField()
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='room_nights'
+    )
+    availability_period = models.ForeignKey(
+        'rooms.RoomAvailability',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='room_nights'
+    )
+
+    class Meta:
+        db_table = 'room_nights'
+        ordering = ['room', 'night']
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'night'], name='unique_room_night'),
+        ]
+        indexes = [
+            models.Index(fields=['night', 'room']),
+        ]
+
+    def __str__(self):
+        return f"{self.room_id} @ {self.night}"
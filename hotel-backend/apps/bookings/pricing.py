@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from apps.rooms.models import Room
+from apps.bookings.models import SeasonalPrice
+
+
+def to_cents(amount) -> int:
+    """Convert a 2-decimal money amount to integer cents"""
+    return int(Decimal(amount).scaleb(2).to_integral_value())
+
+
+def from_cents(cents: int) -> Decimal:
+    """Convert integer cents back to a 2-decimal Decimal (e.g. 15050 -> 150.50)"""
+    return Decimal(cents).scaleb(-2)
+
+
+class StayQuote:
+    """Nightly rates and total for one room and stay"""
+
+    def __init__(self, room_id: int, check_in: date, nightly_cents: list):
+        self.room_id = room_id
+        self.check_in = check_in
+        self.nightly_cents = nightly_cents
+
+    @property
+    def total_cents(self) -> int:
+        return sum(self.nightly_cents)
+
+    @property
+    def total(self) -> Decimal:
+        return from_cents(self.total_cents)
+
+    def breakdown(self):
+        """Per-night breakdown: [{'date': 'YYYY-MM-DD', 'price': '150.00'}, ...]"""
+        return [
+            {
+                'date': (self.check_in + timedelta(days=offset)).isoformat(),
+                'price': str(from_cents(cents)),
+            }
+            for offset, cents in enumerate(self.nightly_cents)
+        ]
+
+
+class PricingEngine:
+    """
+    Resolve nightly rates for one or more rooms from a single SeasonalPrice query.
+
+    For every night the first seasonal price (by start date) whose
+    [start_date, end_date] range covers the night wins; nights without a
+    seasonal price use the room's base price. All arithmetic is done in
+    integer cents.
+    """
+
+    def __init__(self, base_prices: dict, seasonal_prices):
+        """
+        base_prices: {room_id: base_price_per_night}
+        seasonal_prices: iterable of (room_id, start_date, end_date, price_per_night)
+                         ordered by start date
+        """
+        self.base_cents = {room_id: to_cents(price) for room_id, price in base_prices.items()}
+        self.seasons = {}
+        for room_id, start, end, price in seasonal_prices:
+            self.seasons.setdefault(room_id, []).append((start, end, to_cents(price)))
+
+    @classmethod
+    def load(cls, room_ids, start: date, end: date, base_prices: dict = None):
+        """Build an engine for stays of the given rooms between start and end"""
+        room_ids = set(room_ids)
+        if base_prices is None:
+            base_prices = dict(
+                Room.objects.filter(id__in=room_ids).values_list('id', 'base_price_per_night')
+            )
+        seasonal_prices = SeasonalPrice.objects.filter(
+            room_id__in=room_ids,
+            start_date__lt=end,
+            end_date__gte=start
+        ).order_by('start_date', 'id').values_list('room_id', 'start_date', 'end_date', 'price_per_night')
+        return cls(base_prices, seasonal_prices)
+
+    def nightly_cents(self, room_id: int, check_in: date, check_out: date) -> list:
+        """Price in cents of every night from check_in up to (not including) check_out"""
+        nights = (check_out - check_in).days
+        if nights <= 0:
+            return []
+
+        rates = [None] * nights
+        for start, end, cents in self.seasons.get(room_id, []):
+            first = max((start - check_in).days, 0)
+            last = min((end - check_in).days, nights - 1)
+            for offset in range(first, last + 1):
+                if rates[offset] is None:
+                    rates[offset] = cents
+
+        base = self.base_cents[room_id]
+        return [base if cents is None else cents for cents in rates]
+
+    def quote(self, room_id: int, check_in: date, check_out: date) -> StayQuote:
+        return StayQuote(room_id, check_in, self.nightly_cents(room_id, check_in, check_out))
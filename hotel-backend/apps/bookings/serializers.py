@@ -1,7 +1,11 @@
+from django.db.models import F, OuterRef, Subquery
 from rest_framework import serializers
 from apps.bookings.models import Booking, SeasonalPrice
+from apps.rooms.models import RoomImage
+from apps.core.fast_serializers import MediaUrls
 from apps.bookings.services import BookingService
 from apps.rooms.serializers import RoomListSerializer
+from apps.core.fieldsets import SparseFieldsetSerializerMixin
 from datetime import date
 
 
@@ -69,11 +73,12 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         if request and request.user.is_authenticated:
             validated_data['guest'] = request.user
 
-        return super().create(validated_data)
+        # Dates taken since validate() are rejected with a 409 (BookingConflict)
+        return BookingService.create_booking(**validated_data)
 
 
-class BookingSerializer(serializers.ModelSerializer):
-    """Read booking details"""
+class BookingSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
+    """Read booking details (?fields= / ?expand=room supported)"""
     room = RoomListSerializer(read_only=True)
     nights = serializers.IntegerField(read_only=True)
 
@@ -87,6 +92,50 @@ class BookingSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
 
+    expandable_fields = ('room',)
+    field_sources = {'nights': ('check_in_date', 'check_out_date')}
+
+
+class BookingSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact booking for lists: the room is reduced to id, name, slug and
+    primary image. Expects a queryset prepared by with_room_summary().
+    """
+    nights = serializers.IntegerField(read_only=True)
+    room = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Booking
+        fields = [
+            'id', 'room', 'check_in_date', 'check_out_date', 'number_of_guests',
+            'total_price', 'status', 'nights', 'created_at'
+        ]
+
+    @classmethod
+    def with_room_summary(cls, queryset):
+        """Annotate the room fields and primary image, so one joined query serves the page"""
+        # Same choice as RoomListSerializer.primary_image: RoomImage ordering puts the primary first
+        primary_image = RoomImage.objects.filter(room_id=OuterRef('room_id')).order_by(*RoomImage._meta.ordering)
+        return queryset.only(
+            'id', 'room_id', 'check_in_date', 'check_out_date', 'number_of_guests',
+            'total_price', 'status', 'created_at'
+        ).annotate(
+            room_name=F('room__name'),
+            room_slug=F('room__slug'),
+            room_image=Subquery(primary_image.values('image')[:1]),
+            room_image_url=Subquery(primary_image.values('image_url')[:1]),
+        )
+
+    def get_room(self, obj):
+        if 'media' not in self.context:
+            self.context['media'] = MediaUrls(RoomImage, 'image', self.context.get('request'))
+        return {
+            'id': obj.room_id,
+            'name': obj.room_name,
+            'slug': obj.room_slug,
+            'primary_image': self.context['media'].url(obj.room_image) or obj.room_image_url or None,
+        }
+
 
 class SeasonalPriceSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,8 +1,14 @@
+import heapq
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from datetime import date, timedelta
 from decimal import Decimal
 from apps.rooms.models import Room, RoomAvailability
-from apps.bookings.models import Booking, SeasonalPrice
+from apps.bookings.models import Booking
+from apps.bookings.exceptions import BookingConflict
+from apps.bookings.inventory import InventoryService, nights_between
+from apps.bookings.locks import room_lock
+from apps.bookings.pricing import PricingEngine, StayQuote, from_cents
 
 
 class BookingService:
@@ -13,35 +19,88 @@ class BookingService:
         """
         Check if a room is available for given dates.
 
-        A room is unavailable if:
-        1. There's ANY booking where dates overlap (not cancelled)
-        2. There's ANY availability period blocking the dates
+        A room is unavailable if any night from check-in up to check-out is
+        already in the RoomNight inventory, i.e. held by a booking that is not
+        cancelled or by an availability period (maintenance, admin blocks, etc.).
+        This is a single indexed range probe on (room, night).
+        """
+        return InventoryService.is_available(room_id, check_in, check_out)
+
+    @staticmethod
+    def create_booking(**booking_data) -> Booking:
+        """
+        Reserve a room and create the booking.
+
+        Reservations for the same room are serialized by a per-room lock in this
+        process; the availability re-check under the lock rejects the loser of
+        a race with BookingConflict (409) before it writes anything. Across
+        processes the RoomNight unique constraint is the final arbiter, and a
+        violation is reported the same way. The booking, its RoomNight rows
+        and its BUSY availability period are written in one transaction.
+        """
+        room = booking_data['room']
+        check_in = booking_data['check_in_date']
+        check_out = booking_data['check_out_date']
+
+        with room_lock(room.id):
+            if not BookingService.check_availability(room.id, check_in, check_out):
+                raise BookingConflict()
 
-        Overlap conditions:
-        - New check-in is before existing check-out/end-date AND
-        - New check-out is after existing check-in/start-date
+            try:
+                with transaction.atomic():
+                    booking = Booking.objects.create(**booking_data)
+
+                    # Auto-create busy period for confirmed bookings
+                    if booking.status in ['CONFIRMED', 'PENDING']:
+                        RoomAvailability.objects.create(
+                            room=booking.room,
+                            start_date=booking.check_in_date,
+                            end_date=booking.check_out_date,
+                            status='BUSY',
+                            booking=booking,
+                            notes=f'Auto-created for booking #{booking.id}'
+                        )
+            except IntegrityError:
+                raise BookingConflict()
+
+        return booking
+
+    @staticmethod
+    def update_booking(booking: Booking, **changes) -> Booking:
         """
-        # Check for conflicting bookings
-        conflicting_bookings = Booking.objects.filter(
-            room_id=room_id,
-            check_in_date__lt=check_out,  # Existing check-in before new check-out
-            check_out_date__gt=check_in   # Existing check-out after new check-in
-        ).exclude(status=Booking.Status.CANCELLED)
+        Apply changes (dates, room, status, ...) to an existing booking.
 
-        if conflicting_bookings.exists():
-            return False
+        Uses the same per-room lock and conflict reporting as create_booking:
+        moving the stay onto taken nights, or reactivating a cancelled booking
+        whose nights were sold since, raises BookingConflict (409). A booking
+        reactivated from CANCELLED gets its BUSY availability period back;
+        cancelling releases it (InventoryService.sync_booking).
+        """
+        old_status = booking.status
+        for field, value in changes.items():
+            setattr(booking, field, value)
 
-        # Check for blocked/unavailable periods (maintenance, admin blocks, etc.)
-        conflicting_availability = RoomAvailability.objects.filter(
-            room_id=room_id,
-            start_date__lt=check_out,  # Block starts before new check-out
-            end_date__gt=check_in      # Block ends after new check-in
-        )
+        with room_lock(booking.room_id):
+            try:
+                with transaction.atomic():
+                    # Saving re-syncs the booking's RoomNight inventory and BUSY period
+                    booking.save()
 
-        if conflicting_availability.exists():
-            return False
+                    if booking.status in ['CONFIRMED', 'PENDING'] and old_status == 'CANCELLED':
+                        RoomAvailability.objects.get_or_create(
+                            room=booking.room,
+                            booking=booking,
+                            defaults={
+                                'start_date': booking.check_in_date,
+                                'end_date': booking.check_out_date,
+                                'status': 'BUSY',
+                                'notes': f'Auto-created for booking #{booking.id}'
+                            }
+                        )
+            except IntegrityError:
+                raise BookingConflict()
 
-        return True
+        return booking
 
     @staticmethod
     def get_available_rooms(check_in: date, check_out: date, capacity: int = None):
@@ -52,6 +111,7 @@ class BookingService:
         This means NO overlapping:
         1. Bookings (except cancelled ones)
         2. RoomAvailability periods (maintenance, blocks, etc.)
+        Both are materialized in the RoomNight inventory.
         """
         # Get all active rooms
         rooms = Room.objects.filter(is_active=True)
@@ -59,25 +119,11 @@ class BookingService:
         if capacity:
             rooms = rooms.filter(capacity__gte=capacity)
 
-        # Filter out rooms with conflicting bookings
-        # A booking conflicts if: booking_check_in < search_check_out AND booking_check_out > search_check_in
-        conflicting_booking_ids = Booking.objects.filter(
-            check_in_date__lt=check_out,   # Booking starts before our check-out
-            check_out_date__gt=check_in    # Booking ends after our check-in
-        ).exclude(status=Booking.Status.CANCELLED).values_list('room_id', flat=True)
-
-        # Filter out rooms with conflicting availability periods (blocked, maintenance, etc.)
-        # Same overlap logic applies
-        conflicting_availability_ids = RoomAvailability.objects.filter(
-            start_date__lt=check_out,      # Block starts before our check-out
-            end_date__gt=check_in          # Block ends after our check-in
-        ).values_list('room_id', flat=True)
-
-        # Combine both exclusion lists
-        all_unavailable_room_ids = set(conflicting_booking_ids) | set(conflicting_availability_ids)
+        # One indexed range scan of the RoomNight inventory, run as a subquery
+        occupied_room_ids = InventoryService.occupied_nights(check_in, check_out).values('room_id')
 
         # Return only rooms that are NOT in the unavailable list
-        available_rooms = rooms.exclude(id__in=all_unavailable_room_ids)
+        available_rooms = rooms.exclude(id__in=occupied_room_ids)
 
         return available_rooms
 
@@ -86,30 +132,199 @@ class BookingService:
         """
         Calculate total price considering base price and seasonal pricing.
 
-        Algorithm:
-        1. Get number of nights
-        2. For each night, check if there's a seasonal price
-        3. If yes, use seasonal price; else use base price
-        4. Sum all night prices
-        """
-        room = Room.objects.get(id=room_id)
-        total = Decimal('0.00')
-        current_date = check_in
-
-        while current_date < check_out:
-            # Check for seasonal price
-            seasonal_price = SeasonalPrice.objects.filter(
-                room=room,
-                start_date__lte=current_date,
-                end_date__gte=current_date
-            ).first()
-
-            if seasonal_price:
-                total += seasonal_price.price_per_night
+        Each night uses the first seasonal price covering it, else the room's
+        base price (see PricingEngine).
+        """
+        return BookingService.get_price_quote(room_id, check_in, check_out).total
+
+    @staticmethod
+    def get_price_quote(room_id: int, check_in: date, check_out: date) -> StayQuote:
+        """Nightly rates and total for a stay, from two queries"""
+        base_price = Room.objects.values_list('base_price_per_night', flat=True).get(id=room_id)
+        engine = PricingEngine.load([room_id], check_in, check_out, base_prices={room_id: base_price})
+        return engine.quote(room_id, check_in, check_out)
+
+    @staticmethod
+    def check_availability_batch(stays, breakdown_nights=None):
+        """
+        Check availability and quote prices for many (room_id, check_in, check_out)
+        stays at once.
+
+        Uses a fixed number of queries regardless of how many stays are asked for:
+        1. The requested rooms (for base prices)
+        2. RoomNight inventory rows of those rooms in the overall date span
+        3. Seasonal prices overlapping that span (via PricingEngine)
+        Everything else is resolved in memory with the same rules as
+        check_availability and calculate_total_price.
+
+        breakdown_nights: longest stay that gets per-night rates (None: all)
+        """
+        if not stays:
+            return []
+
+        room_ids = {room_id for room_id, _, _ in stays}
+        span_start = min(check_in for _, check_in, _ in stays)
+        span_end = max(check_out for _, _, check_out in stays)
+
+        rooms = dict(Room.objects.filter(id__in=room_ids).values_list('id', 'base_price_per_night'))
+
+        occupied_nights = set(InventoryService.occupied_nights(span_start, span_end).filter(
+            room_id__in=room_ids
+        ).values_list('room_id', 'night'))
+
+        engine = PricingEngine.load(room_ids, span_start, span_end, base_prices=rooms)
+
+        results = []
+        for room_id, check_in, check_out in stays:
+            if room_id not in rooms:
+                results.append({'available': False, 'total_price': None, 'nightly_rates': None, 'error': 'Room not found'})
+                continue
+
+            available = not any(
+                (room_id, night) in occupied_nights
+                for night in nights_between(check_in, check_out)
+            )
+
+            quote = engine.quote(room_id, check_in, check_out) if available else None
+            itemized = quote is not None and (breakdown_nights is None or len(quote.nightly_cents) <= breakdown_nights)
+            results.append({
+                'available': available,
+                'total_price': quote.total if quote else None,
+                'nightly_rates': quote.breakdown() if itemized else None,
+            })
+
+        return results
+
+    @staticmethod
+    def find_cheapest_stays(base_prices: dict, window_start: date, window_end: date, nights: int, limit: int = 3):
+        """
+        Cheapest available stays of `nights` nights per room inside a date window.
+
+        Stays must check in on or after window_start and check out on or before
+        window_end. Per room, a nightly price array (PricingEngine) and an
+        occupancy array (RoomNight) are built once for the whole window, then a
+        sliding window keeps the running stay total and the number of occupied
+        nights, so every start date is evaluated in O(1).
+
+        base_prices: {room_id: base_price_per_night}
+        Returns {room_id: [{'check_in', 'check_out', 'total_price'}, ...]} cheapest
+        first (earlier dates win ties); rooms with no free stay are left out.
+        """
+        days = (window_end - window_start).days
+        if nights < 1 or days < nights or not base_prices:
+            return {}
+
+        engine = PricingEngine.load(base_prices.keys(), window_start, window_end, base_prices=base_prices)
+        occupied = {}
+        for room_id, night in InventoryService.occupied_nights(window_start, window_end).filter(
+            room_id__in=base_prices.keys()
+        ).values_list('room_id', 'night'):
+            occupied.setdefault(room_id, set()).add((night - window_start).days)
+
+        results = {}
+        for room_id in base_prices:
+            rates = engine.nightly_cents(room_id, window_start, window_end)
+            taken = occupied.get(room_id, set())
+            busy = [1 if offset in taken else 0 for offset in range(days)]
+
+            total = sum(rates[:nights])
+            busy_nights = sum(busy[:nights])
+            candidates = []
+            for first in range(days - nights + 1):
+                if first:
+                    # Slide the window one night: drop the night that left, add the one that entered
+                    total += rates[first + nights - 1] - rates[first - 1]
+                    busy_nights += busy[first + nights - 1] - busy[first - 1]
+                if not busy_nights:
+                    candidates.append((total, first))
+
+            if candidates:
+                results[room_id] = [
+                    {
+                        'check_in': window_start + timedelta(days=first),
+                        'check_out': window_start + timedelta(days=first + nights),
+                        'total_price': from_cents(total),
+                    }
+                    for total, first in heapq.nsmallest(limit, candidates)
+                ]
+
+        return results
+
+    @staticmethod
+    def build_availability_calendar(rooms, start: date, end: date, run_length: bool = False):
+        """
+        Rooms x days status matrix for [start, end] (both inclusive).
+
+        One range query per table (bookings, availability periods), then a
+        sweep paints every interval onto per-room day arrays. A day is
+        'booked', 'maintenance', 'blocked' or 'free'; when several intervals
+        cover the same day the most specific wins (booked > maintenance >
+        blocked). Booked days carry the booking id.
+
+        rooms: iterable of (id, name, slug)
+        run_length: encode each room as [status, length, booking_id] runs
+        """
+        days = (end - start).days + 1
+        span_end = end + timedelta(days=1)
+        rooms = list(rooms)
+        room_ids = [room_id for room_id, _, _ in rooms]
+
+        statuses = {room_id: ['free'] * days for room_id in room_ids}
+        booking_ids = {room_id: [None] * days for room_id in room_ids}
+
+        def paint(room_id, first, last, status, booking_id=None):
+            # Clip [first, last) to the calendar and overwrite the covered days
+            lo = max((first - start).days, 0)
+            hi = min((last - start).days, days)
+            for offset in range(lo, hi):
+                statuses[room_id][offset] = status
+                booking_ids[room_id][offset] = booking_id
+
+        periods = RoomAvailability.objects.filter(
+            room_id__in=room_ids,
+            start_date__lt=span_end,
+            end_date__gt=start
+        ).values_list('room_id', 'start_date', 'end_date', 'status', 'booking_id')
+        bookings = Booking.objects.filter(
+            room_id__in=room_ids,
+            check_in_date__lt=span_end,
+            check_out_date__gt=start
+        ).exclude(status=Booking.Status.CANCELLED).values_list('room_id', 'check_in_date', 'check_out_date', 'id')
+
+        # Lowest precedence first so later layers win
+        period_layers = {
+            RoomAvailability.Status.BLOCKED: 0,
+            RoomAvailability.Status.MAINTENANCE: 1,
+            RoomAvailability.Status.BUSY: 2,
+        }
+        for room_id, first, last, status, booking_id in sorted(periods, key=lambda p: period_layers.get(p[3], 0)):
+            if status == RoomAvailability.Status.BUSY:
+                paint(room_id, first, last, 'booked', booking_id)
             else:
-                total += room.base_price_per_night
+                paint(room_id, first, last, status.lower())
+        for room_id, first, last, booking_id in bookings:
+            paint(room_id, first, last, 'booked', booking_id)
 
-            # Move to next day
-            current_date += timedelta(days=1)
+        result = []
+        for room_id, name, slug in rooms:
+            row = {'id': room_id, 'name': name, 'slug': slug}
+            if run_length:
+                runs = []
+                for status, booking_id in zip(statuses[room_id], booking_ids[room_id]):
+                    if runs and runs[-1][0] == status and runs[-1][2] == booking_id:
+                        runs[-1][1] += 1
+                    else:
+                        runs.append([status, 1, booking_id])
+                row['runs'] = runs
+            else:
+                row['statuses'] = statuses[room_id]
+                row['booking_ids'] = booking_ids[room_id]
+            result.append(row)
 
-        return total
+        return {
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'days': days,
+            'encoding': 'rle' if run_length else 'dense',
+            'rooms': result,
+        }
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from apps.bookings.inventory import InventoryService
+from apps.bookings.models import Booking
+from apps.rooms.models import RoomAvailability
+
+
+@receiver(post_save, sender=Booking)
+def sync_booking_nights(sender, instance, raw=False, **kwargs):
+    """Reserve or release the booking's RoomNight rows (inside Booking.save's transaction)"""
+    if not raw:
+        InventoryService.sync_booking(instance)
+
+
+@receiver(post_save, sender=RoomAvailability)
+def sync_availability_period_nights(sender, instance, raw=False, **kwargs):
+    """Reserve or release the block's RoomNight rows (inside RoomAvailability.save's transaction)"""
+    if not raw:
+        InventoryService.sync_availability_period(instance)
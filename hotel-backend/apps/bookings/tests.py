@@ -1,3 +1,474 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.bookings.exceptions import BookingConflict
+from apps.bookings.models import Booking, RoomNight, SeasonalPrice
+from apps.bookings.pricing import PricingEngine, from_cents, to_cents
+from apps.bookings.services import BookingService
+from apps.core.pagination import CursorOrPageNumberPagination
+from apps.rooms.models import Room, RoomImage
+from apps.users.models import CustomUser
 
-# Create your tests here.
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Bookings racing for the same nights on a file-backed SQLite database in WAL mode"""
+
+    THREADS = 12
+
+    def setUp(self):
+        self.room = Room.objects.create(name='Race Room', description='x', base_price_per_night=Decimal('100.00'))
+        self.start = date.today() + timedelta(days=30)
+
+    def booking_data(self, offset, nights, guest):
+        return {
+            'room': self.room,
+            'check_in_date': self.start + timedelta(days=offset),
+            'check_out_date': self.start + timedelta(days=offset + nights),
+            'guest_name': guest,
+            'guest_email': f'{guest}@example.com',
+            'guest_phone': '555',
+            'total_price': Decimal('100.00') * nights,
+        }
+
+    def race(self, stays):
+        """Start every stay at the same moment; return (created, conflicts, errors)"""
+        barrier = threading.Barrier(len(stays))
+        created, conflicts, errors = [], [], []
+
+        def attempt(idx, offset, nights):
+            try:
+                barrier.wait()
+                created.append(BookingService.create_booking(**self.booking_data(offset, nights, f'guest{idx}')))
+            except BookingConflict:
+                conflicts.append(idx)
+            except Exception as exc:  # pragma: no cover - reported by the assertion below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=attempt, args=(idx, offset, nights))
+            for idx, (offset, nights) in enumerate(stays)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return created, conflicts, errors
+
+    def assert_no_overlaps(self):
+        bookings = list(
+            Booking.objects.filter(room=self.room)
+            .exclude(status=Booking.Status.CANCELLED)
+            .order_by('check_in_date')
+        )
+        for previous, current in zip(bookings, bookings[1:]):
+            self.assertLessEqual(previous.check_out_date, current.check_in_date)
+        self.assertEqual(
+            RoomNight.objects.filter(room=self.room).count(),
+            sum(booking.nights for booking in bookings)
+        )
+
+    def test_database_runs_in_wal_mode(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+
+    def test_identical_requests_have_exactly_one_winner(self):
+        created, conflicts, errors = self.race([(0, 3)] * self.THREADS)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(created), 1)
+        self.assertEqual(len(conflicts), self.THREADS - 1)
+        self.assert_no_overlaps()
+
+    def test_overlapping_requests_never_double_book(self):
+        stays = [(offset % 6, 2 + offset % 3) for offset in range(self.THREADS)]
+        created, conflicts, errors = self.race(stays)
+
+        self.assertEqual(errors, [])
+        self.assertGreaterEqual(len(created), 1)
+        self.assertEqual(len(created) + len(conflicts), self.THREADS)
+        self.assert_no_overlaps()
+
+    def test_taken_dates_raise_conflict(self):
+        BookingService.create_booking(**self.booking_data(0, 3, 'first'))
+
+        with self.assertRaises(BookingConflict):
+            BookingService.create_booking(**self.booking_data(2, 2, 'second'))
+
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class BookingUpdateTests(TestCase):
+    """Staff PUT / PATCH keeps the inventory and the BUSY periods consistent"""
+
+    def setUp(self):
+        cache.clear()
+        self.room = Room.objects.create(name='Update Room', description='x', base_price_per_night=Decimal('100.00'))
+        self.start = date.today() + timedelta(days=30)
+        self.first = self.book(0, 3, 'first')
+        self.second = self.book(5, 2, 'second')
+        self.staff = CustomUser.objects.create_user(username='staff', password='x', role='STAFF')
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def book(self, offset, nights, guest):
+        return BookingService.create_booking(
+            room=self.room,
+            check_in_date=self.start + timedelta(days=offset),
+            check_out_date=self.start + timedelta(days=offset + nights),
+            guest_name=guest, guest_email=f'{guest}@example.com', guest_phone='555',
+            total_price=Decimal('100.00') * nights,
+        )
+
+    def patch(self, booking, **data):
+        return self.client.patch(f'/api/bookings/{booking.id}/', data, format='json')
+
+    def test_moving_onto_taken_nights_conflicts(self):
+        response = self.patch(self.second, check_in_date=str(self.start + timedelta(days=1)))
+
+        self.assertEqual(response.status_code, 409)
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.check_in_date, self.start + timedelta(days=5))
+        self.assertEqual(RoomNight.objects.filter(booking=self.second).count(), 2)
+
+    def test_reactivating_over_resold_nights_conflicts(self):
+        self.assertEqual(self.patch(self.first, status='CANCELLED').status_code, 200)
+        self.book(1, 2, 'third')
+
+        response = self.patch(self.first, status='CONFIRMED')
+
+        self.assertEqual(response.status_code, 409)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.status, 'CANCELLED')
+
+    def test_cancelling_releases_the_busy_period(self):
+        self.assertEqual(self.patch(self.first, status='CANCELLED').status_code, 200)
+
+        self.assertFalse(self.first.availability_period.exists())
+        self.assertTrue(BookingService.check_availability(self.room.id, self.start, self.start + timedelta(days=3)))
+        calendar = BookingService.build_availability_calendar(
+            [(self.room.id, self.room.name, self.room.slug)], self.start, self.start + timedelta(days=2)
+        )
+        self.assertEqual(calendar['rooms'][0]['statuses'], ['free'] * 3)
+
+    def test_moved_dates_move_the_busy_period(self):
+        new_in, new_out = self.start + timedelta(days=10), self.start + timedelta(days=12)
+        response = self.patch(self.second, check_in_date=str(new_in), check_out_date=str(new_out))
+
+        self.assertEqual(response.status_code, 200)
+        period = self.second.availability_period.get()
+        self.assertEqual((period.start_date, period.end_date), (new_in, new_out))
+
+
+class AvailabilityBatchTests(TestCase):
+    """check-availability-batch bounds the work and the response per stay"""
+
+    def setUp(self):
+        cache.clear()
+        self.room = Room.objects.create(name='Batch Room', description='x', base_price_per_night=Decimal('100.00'))
+        self.start = date.today() + timedelta(days=30)
+
+    def check(self, nights):
+        stay = {
+            'room_id': self.room.id,
+            'check_in': str(self.start),
+            'check_out': str(self.start + timedelta(days=nights)),
+        }
+        response = APIClient().post('/api/bookings/check-availability-batch/', {'stays': [stay]}, format='json')
+        return response.json()['results'][0]
+
+    def test_short_stays_are_itemized(self):
+        result = self.check(3)
+
+        self.assertEqual(result['total_price'], '300.00')
+        self.assertEqual(len(result['nightly_rates']), 3)
+
+    def test_long_stays_get_a_total_only(self):
+        result = self.check(60)
+
+        self.assertEqual(result['total_price'], '6000.00')
+        self.assertIsNone(result['nightly_rates'])
+
+    def test_query_count_does_not_grow_with_stays(self):
+        rooms = [self.room] + [
+            Room.objects.create(name=f'Batch Room {index}', description='x', base_price_per_night=Decimal('80.00'))
+            for index in range(3)
+        ]
+        for room in rooms:
+            SeasonalPrice.objects.create(
+                room=room, name='Peak', price_per_night=Decimal('150.00'),
+                start_date=self.start + timedelta(days=5), end_date=self.start + timedelta(days=9)
+            )
+        Booking.objects.create(
+            room=rooms[1], check_in_date=self.start + timedelta(days=2), check_out_date=self.start + timedelta(days=4),
+            guest_name='Guest', guest_email='guest@example.com', guest_phone='555', total_price=Decimal('160.00'),
+        )
+        stays = [
+            (room.id, self.start + timedelta(days=offset), self.start + timedelta(days=offset + 3))
+            for room in rooms for offset in range(0, 12, 2)
+        ]
+
+        # rooms, RoomNight inventory, seasonal prices
+        with self.assertNumQueries(3):
+            one = BookingService.check_availability_batch(stays[:1])
+        with self.assertNumQueries(3):
+            results = BookingService.check_availability_batch(stays)
+
+        self.assertEqual(one[0], results[0])
+        self.assertEqual(len(results), 24)
+        self.assertFalse(results[6]['available'])
+        self.assertEqual(results[3]['total_price'], Decimal('450.00'))
+        for (room_id, check_in, check_out), result in zip(stays, results):
+            self.assertEqual(result['available'], BookingService.check_availability(room_id, check_in, check_out))
+            if result['available']:
+                self.assertEqual(result['total_price'], BookingService.calculate_total_price(room_id, check_in, check_out))
+
+    def test_overlong_stays_are_rejected(self):
+        result = self.check(367)
+
+        self.assertFalse(result['available'])
+        self.assertIn('366 nights', result['error'])
+
+
+class BookingExportTests(TestCase):
+    """Staff export streams every matching booking as CSV or NDJSON"""
+
+    def setUp(self):
+        self.room = Room.objects.create(name='Export Room', description='x', base_price_per_night=Decimal('100.00'))
+        self.start = date.today() + timedelta(days=10)
+        self.formula = self.book(0, '=HYPERLINK("http://x","y")', special_requests='+1 extra bed')
+        self.cancelled = self.book(5, 'Plain Guest', status=Booking.Status.CANCELLED, guest_phone='-555')
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(username='staff', password='x', role='STAFF'))
+
+    def book(self, offset, name, **extra):
+        return Booking.objects.create(
+            room=self.room,
+            check_in_date=self.start + timedelta(days=offset),
+            check_out_date=self.start + timedelta(days=offset + 2),
+            guest_name=name, guest_email='guest@example.com', guest_phone=extra.pop('guest_phone', '555'),
+            total_price=Decimal('200.00'), **extra
+        )
+
+    def export(self, query=''):
+        response = self.client.get('/api/bookings/export/' + query)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_escapes_formulas(self):
+        rows = list(csv.DictReader(io.StringIO(self.export())))
+
+        self.assertEqual([int(row['id']) for row in rows], [self.formula.id, self.cancelled.id])
+        self.assertEqual(rows[0]['guest_name'], '\'=HYPERLINK("http://x","y")')
+        self.assertEqual(rows[0]['special_requests'], "'+1 extra bed")
+        self.assertEqual(rows[0]['room_name'], 'Export Room')
+        self.assertEqual(rows[0]['total_price'], '200.00')
+        self.assertEqual(rows[1]['guest_phone'], "'-555")
+
+    def test_ndjson_keeps_values_verbatim(self):
+        rows = [json.loads(line) for line in self.export('?file_format=ndjson').splitlines()]
+
+        self.assertEqual(rows[0]['guest_name'], '=HYPERLINK("http://x","y")')
+        self.assertEqual(rows[0]['check_in_date'], self.start.isoformat())
+        self.assertEqual(rows[1]['status'], 'CANCELLED')
+
+    def test_status_and_date_filters(self):
+        cancelled = self.export('?file_format=ndjson&status=CANCELLED').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in cancelled], [self.cancelled.id])
+
+        query = f'?file_format=ndjson&start_date={self.start + timedelta(days=1)}'
+        self.assertEqual([json.loads(line)['id'] for line in self.export(query).splitlines()], [self.cancelled.id])
+        query = f'?file_format=ndjson&end_date={self.start + timedelta(days=2)}'
+        self.assertEqual([json.loads(line)['id'] for line in self.export(query).splitlines()], [self.formula.id])
+
+    def test_bad_parameters_are_rejected(self):
+        self.assertEqual(self.client.get('/api/bookings/export/?start_date=garbage').status_code, 400)
+        self.assertEqual(self.client.get('/api/bookings/export/?file_format=xlsx').status_code, 400)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(CustomUser.objects.create_user(username='guest', password='x'))
+        self.assertEqual(self.client.get('/api/bookings/export/').status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/bookings/export/').status_code, 401)
+
+
+class PricingEngineTests(TestCase):
+    """PricingEngine matches the former per-night Decimal loop to the cent"""
+
+    def setUp(self):
+        self.room = Room.objects.create(name='Priced Room', description='x', base_price_per_night=Decimal('100.00'))
+        self.start = date.today() + timedelta(days=30)
+        self.season(2, 5, '150.50')   # end_date is inclusive
+        self.season(4, 8, '120.25')   # overlaps: the earlier start wins on nights 4-5
+        self.season(10, 12, '99.99')
+        self.season(10, 11, '80.00')  # same start: the lower id wins
+
+    def season(self, first, last, price):
+        SeasonalPrice.objects.create(
+            room=self.room, name=price, price_per_night=Decimal(price),
+            start_date=self.start + timedelta(days=first), end_date=self.start + timedelta(days=last)
+        )
+
+    def legacy_nightly_rates(self, check_in, check_out):
+        """The loop PricingEngine replaced (ties made deterministic by id)"""
+        rates, night = [], check_in
+        while night < check_out:
+            seasonal = SeasonalPrice.objects.filter(
+                room=self.room, start_date__lte=night, end_date__gte=night
+            ).order_by('start_date', 'id').first()
+            rates.append(seasonal.price_per_night if seasonal else self.room.base_price_per_night)
+            night += timedelta(days=1)
+        return rates
+
+    def test_matches_the_legacy_loop_for_every_stay(self):
+        last = self.start + timedelta(days=15)
+        engine = PricingEngine.load([self.room.id], self.start, last)
+        for first in range(15):
+            check_in = self.start + timedelta(days=first)
+            for nights in range(1, 16 - first):
+                check_out = check_in + timedelta(days=nights)
+                legacy = self.legacy_nightly_rates(check_in, check_out)
+                quote = engine.quote(self.room.id, check_in, check_out)
+
+                self.assertEqual(quote.total, sum(legacy))
+                self.assertEqual([night['price'] for night in quote.breakdown()], [str(rate) for rate in legacy])
+
+    def test_season_rules(self):
+        check_out = self.start + timedelta(days=13)
+        prices = [night['price'] for night in BookingService.get_price_quote(self.room.id, self.start, check_out).breakdown()]
+
+        self.assertEqual(prices, [
+            '100.00', '100.00',                          # base price
+            '150.50', '150.50', '150.50', '150.50',      # first season, end date included
+            '120.25', '120.25', '120.25',                # second season after the overlap
+            '100.00',
+            '99.99', '99.99', '99.99',                   # start date tie: lower id
+        ])
+        self.assertEqual(BookingService.calculate_total_price(self.room.id, self.start, check_out), Decimal('1562.72'))
+
+    def test_cents_round_trip(self):
+        self.assertEqual(from_cents(to_cents(Decimal('150.50'))), Decimal('150.50'))
+        self.assertEqual(str(from_cents(to_cents('0.07'))), '0.07')
+        self.assertEqual(str(from_cents(12000)), '120.00')
+
+
+class SparseBookingFieldsTests(TestCase):
+    """?fields= / ?expand= on booking reads trim both the output and the query"""
+
+    def setUp(self):
+        cache.clear()
+        self.room = Room.objects.create(name='Sparse Room', description='x', base_price_per_night=Decimal('100.00'))
+        RoomImage.objects.create(room=self.room, image_url='https://example.com/a.jpg', is_primary=True)
+        self.staff = CustomUser.objects.create_user(username='staff', password='x', role='STAFF')
+        for offset in range(3):
+            Booking.objects.create(
+                room=self.room,
+                check_in_date=date.today() + timedelta(days=10 + offset * 5),
+                check_out_date=date.today() + timedelta(days=12 + offset * 5),
+                guest_name='Guest', guest_email='guest@example.com', guest_phone='555',
+                total_price=Decimal('200.00'),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_legacy_output_embeds_the_room(self):
+        booking = self.client.get('/api/bookings/').json()['results'][0]
+
+        self.assertEqual(booking['room']['name'], 'Sparse Room')
+        self.assertEqual(booking['room']['primary_image'], 'https://example.com/a.jpg')
+        self.assertIn('guest_email', booking)
+
+    def test_unexpanded_room_is_an_id_from_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/?expand=&fields=id,room,nights')
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"rooms"', queries[0]['sql'])
+        self.assertNotIn('description', queries[0]['sql'])
+
+        for booking in response.json()['results']:
+            self.assertEqual(set(booking), {'id', 'room', 'nights'})
+            self.assertEqual(booking['room'], self.room.id)
+            self.assertEqual(booking['nights'], 2)
+
+    def test_expanded_room_fields_skip_unneeded_prefetches(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/?expand=room&fields=id,room.name,room.slug')
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('guest_email', queries[0]['sql'])
+        self.assertNotIn('description', queries[0]['sql'])
+        for booking in response.json()['results']:
+            self.assertEqual(booking['room'], {'name': 'Sparse Room', 'slug': self.room.slug})
+
+    def test_expanded_room_images_are_prefetched(self):
+        # bookings + room join, windowed images prefetch
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/bookings/?expand=room&fields=id,room.primary_image')
+
+        self.assertEqual(response.json()['results'][0]['room'], {'primary_image': 'https://example.com/a.jpg'})
+
+
+class MyBookingsTests(TestCase):
+    """my-bookings is paginated and rendered from one joined query"""
+
+    def setUp(self):
+        cache.clear()
+        self.guest = CustomUser.objects.create_user(username='guest', password='x')
+        self.room = Room.objects.create(name='Summary Room', description='x', base_price_per_night=Decimal('100.00'))
+        RoomImage.objects.create(room=self.room, image_url='https://example.com/second.jpg', order=1)
+        RoomImage.objects.create(room=self.room, image_url='https://example.com/primary.jpg', is_primary=True)
+        for offset in range(3):
+            Booking.objects.create(
+                room=self.room, guest=self.guest,
+                check_in_date=date.today() + timedelta(days=10 + offset * 5),
+                check_out_date=date.today() + timedelta(days=12 + offset * 5),
+                guest_name='Guest', guest_email='guest@example.com', guest_phone='555',
+                total_price=Decimal('200.00'),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.guest)
+
+    def test_compact_summary_from_one_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/my-bookings/')
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('description', queries[0]['sql'])
+        bookings = response.json()['results']
+        self.assertEqual(len(bookings), 3)
+        self.assertEqual(bookings[0]['room'], {
+            'id': self.room.id,
+            'name': 'Summary Room',
+            'slug': self.room.slug,
+            'primary_image': 'https://example.com/primary.jpg',
+        })
+        self.assertEqual(bookings[0]['nights'], 2)
+        self.assertNotIn('guest_email', bookings[0])
+
+    def test_pages_follow_the_cursor(self):
+        with mock.patch.object(CursorOrPageNumberPagination, 'page_size', 2):
+            first = self.client.get('/api/bookings/my-bookings/').json()
+            self.assertEqual(len(first['results']), 2)
+            second = self.client.get(first['next']).json()
+
+        self.assertEqual(len(second['results']), 1)
+        ids = [booking['id'] for booking in first['results'] + second['results']]
+        self.assertEqual(ids, list(Booking.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_only_own_bookings(self):
+        other = CustomUser.objects.create_user(username='other', password='x')
+        self.client.force_authenticate(other)
+
+        self.assertEqual(self.client.get('/api/bookings/my-bookings/').json()['results'], [])
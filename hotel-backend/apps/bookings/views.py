@@ -1,31 +1,65 @@
-from rest_framework import viewsets, status
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import serializers, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from apps.bookings.models import Booking
-from apps.bookings.serializers import BookingCreateSerializer, BookingSerializer
+from apps.bookings.serializers import BookingCreateSerializer, BookingSerializer, BookingSummarySerializer
 from apps.bookings.services import BookingService
 from apps.rooms.views import IsAdminOrStaff
-from apps.rooms.models import RoomAvailability
+from apps.rooms.serializers import RoomListSerializer
+from apps.core.pagination import CursorOrPageNumberPagination
+from apps.core.fieldsets import SparseFieldsetViewMixin
 from datetime import datetime
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+# Leading characters that make spreadsheet apps evaluate a CSV cell
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class BookingViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     Public endpoints:
-    - POST /api/bookings/ - Create booking
+    - POST /api/bookings/ - Create booking (409 if the dates were just taken)
     - GET /api/bookings/check-availability/ - Check availability
+    - POST /api/bookings/check-availability-batch/ - Check availability and prices for many stays
 
     Authenticated endpoints:
     - GET /api/bookings/ - List user's bookings
+    - GET /api/bookings/my-bookings/ - The user's bookings as compact summaries (paginated)
+
+    Lists use cursor pagination (follow `next`); send ?page=N for page numbers.
+    Reads accept ?fields=id,status,room.name,... and ?expand=room (room is an id otherwise).
 
     Admin endpoints:
     - GET /api/bookings/ - List all bookings (for admin)
+    - GET /api/bookings/export/?file_format=csv|ndjson - Stream all bookings (same filters)
     - PATCH /api/bookings/{id}/ - Update booking (status, etc.)
     - DELETE /api/bookings/{id}/ - Delete booking
     - PATCH /api/bookings/{id}/update_status/ - Update booking status
     """
-    queryset = Booking.objects.select_related('room').prefetch_related('room__images').order_by('-created_at')
+    queryset = Booking.objects.order_by('-created_at', '-id')
+    pagination_class = CursorOrPageNumberPagination
+    ordering = ('-created_at', '-id')
+
+    # Upper bounds for check_availability_batch: stays per request, nights
+    # per stay, and stay length that still gets a per-night breakdown
+    MAX_BATCH_STAYS = 100
+    MAX_BATCH_STAY_NIGHTS = 366
+    MAX_BATCH_BREAKDOWN_NIGHTS = 31
+
+    # Columns and fetch size for the streaming export
+    EXPORT_FIELDS = (
+        'id', 'room_id', 'room_name', 'check_in_date', 'check_out_date',
+        'guest_name', 'guest_email', 'guest_phone', 'number_of_guests',
+        'special_requests', 'total_price', 'status', 'created_at', 'updated_at',
+    )
+    EXPORT_CHUNK_SIZE = 2000
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -33,9 +67,9 @@ class BookingViewSet(viewsets.ModelViewSet):
         return BookingSerializer
 
     def get_permissions(self):
-        if self.action == 'create' or self.action == 'check_availability':
+        if self.action in ['create', 'check_availability', 'check_availability_batch']:
             return [AllowAny()]
-        elif self.action in ['update', 'partial_update', 'destroy', 'update_status']:
+        elif self.action in ['update', 'partial_update', 'destroy', 'update_status', 'export']:
             return [IsAdminOrStaff()]
         return [IsAuthenticated()]
 
@@ -45,43 +79,108 @@ class BookingViewSet(viewsets.ModelViewSet):
         if not user or not user.is_authenticated:
             return Booking.objects.none()
 
+        queryset = self.with_room(super().get_queryset())
+
         # Admin/Staff can see all bookings
         if hasattr(user, 'role') and user.role in ['ADMIN', 'STAFF']:
-            queryset = super().get_queryset()
+            return self.filter_by_params(queryset)
 
-            # Filter by status if provided
-            status_filter = self.request.query_params.get('status')
-            if status_filter:
-                queryset = queryset.filter(status=status_filter)
+        # Regular users see only their bookings
+        return queryset.filter(guest=user)
 
-            # Filter by date range
-            start_date = self.request.query_params.get('start_date')
-            end_date = self.request.query_params.get('end_date')
-            if start_date:
-                queryset = queryset.filter(check_in_date__gte=start_date)
-            if end_date:
-                queryset = queryset.filter(check_out_date__lte=end_date)
+    def with_room(self, queryset):
+        """Join / prefetch the embedded room, as far as ?fields= / ?expand= need it"""
+        return self.trim_queryset(
+            queryset,
+            select_related=['room'],
+            prefetch_related=[RoomListSerializer.images_prefetch('room__images'), 'room__amenities']
+        )
 
-            return queryset
+    def filter_by_params(self, queryset):
+        """Apply the staff status / date range filters from the query string"""
+        # Filter by status if provided
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
 
-        # Regular users see only their bookings
-        return super().get_queryset().filter(guest=user)
-
-    def perform_create(self, serializer):
-        """Create booking and automatically create busy period"""
-        booking = serializer.save()
-
-        # Auto-create busy period for confirmed bookings
-        if booking.status in ['CONFIRMED', 'PENDING']:
-            RoomAvailability.objects.create(
-                room=booking.room,
-                start_date=booking.check_in_date,
-                end_date=booking.check_out_date,
-                status='BUSY',
-                booking=booking,
-                notes=f'Auto-created for booking #{booking.id}'
+        # Filter by date range
+        start_date = self.parse_date_param('start_date')
+        end_date = self.parse_date_param('end_date')
+        if start_date:
+            queryset = queryset.filter(check_in_date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(check_out_date__lte=end_date)
+
+        return queryset
+
+    def parse_date_param(self, name):
+        """A YYYY-MM-DD query parameter as a date (None when absent); 400 when malformed"""
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise serializers.ValidationError({name: 'Use the YYYY-MM-DD format'})
+
+    def perform_update(self, serializer):
+        # Same locking and 409 on taken nights as create / update_status
+        BookingService.update_booking(serializer.instance, **serializer.validated_data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminOrStaff])
+    def export(self, request):
+        """
+        Stream every booking matching the status / date filters as CSV (default)
+        or NDJSON (?file_format=ndjson). Rows are read with a server-side
+        iterator and written out as they arrive, so memory stays flat.
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in ('csv', 'ndjson'):
+            return Response(
+                {'error': 'file_format must be csv or ndjson'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
+        rows = self.filter_by_params(Booking.objects.order_by('id')).annotate(
+            room_name=F('room__name')
+        ).values_list(
+            *self.EXPORT_FIELDS
+        ).iterator(chunk_size=self.EXPORT_CHUNK_SIZE)
+
+        if file_format == 'csv':
+            content = self._export_csv(rows)
+            content_type = 'text/csv'
+        else:
+            content = self._export_ndjson(rows)
+            content_type = 'application/x-ndjson'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f'bookings-{timezone.now():%Y%m%d-%H%M%S}.{file_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def _export_csv(self, rows):
+        # csv.writer writes to anything with .write(); hand each line straight back
+        class Echo:
+            def write(self, value):
+                return value
+
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.EXPORT_FIELDS)
+        for row in rows:
+            yield writer.writerow([self._csv_cell(value) for value in row])
+
+    @staticmethod
+    def _csv_cell(value):
+        """Neutralize guest text a spreadsheet would run as a formula"""
+        if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+            return "'" + value
+        return value
+
+    def _export_ndjson(self, rows):
+        for row in rows:
+            yield json.dumps(dict(zip(self.EXPORT_FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def check_availability(self, request):
         """Check if a room is available for given dates"""
@@ -106,16 +205,20 @@ class BookingViewSet(viewsets.ModelViewSet):
             )
 
             total_price = None
+            nightly_rates = None
             if is_available:
-                total_price = str(BookingService.calculate_total_price(
+                quote = BookingService.get_price_quote(
                     int(room_id),
                     check_in_date,
                     check_out_date
-                ))
+                )
+                total_price = str(quote.total)
+                nightly_rates = quote.breakdown()
 
             return Response({
                 'available': is_available,
-                'total_price': total_price
+                'total_price': total_price,
+                'nightly_rates': nightly_rates
             })
         except ValueError as e:
             return Response(
@@ -123,18 +226,96 @@ class BookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny], url_path='check-availability-batch')
+    def check_availability_batch(self, request):
+        """
+        Check availability and total price for many stays in one request.
+        Expects {"stays": [{"room_id", "check_in", "check_out"}, ...]}
+
+        Stays longer than MAX_BATCH_STAY_NIGHTS are rejected; stays longer
+        than MAX_BATCH_BREAKDOWN_NIGHTS get a total but no nightly_rates.
+        """
+        stays = request.data.get('stays')
+
+        if not isinstance(stays, list) or not stays:
+            return Response(
+                {'error': 'Expected "stays" to be a non-empty array of {room_id, check_in, check_out} objects'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(stays) > self.MAX_BATCH_STAYS:
+            return Response(
+                {'error': f'At most {self.MAX_BATCH_STAYS} stays can be checked per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Parse every stay up front; invalid ones are reported without failing the batch
+        parsed = []
+        errors = {}
+        for idx, item in enumerate(stays):
+            try:
+                room_id = int(item.get('room_id'))
+                check_in_date = datetime.strptime(item.get('check_in'), '%Y-%m-%d').date()
+                check_out_date = datetime.strptime(item.get('check_out'), '%Y-%m-%d').date()
+            except (AttributeError, TypeError, ValueError):
+                errors[idx] = 'Invalid date format or room_id'
+                continue
+
+            if check_out_date <= check_in_date:
+                errors[idx] = 'Check-out date must be after check-in date'
+                continue
+
+            if (check_out_date - check_in_date).days > self.MAX_BATCH_STAY_NIGHTS:
+                errors[idx] = f'Stays are limited to {self.MAX_BATCH_STAY_NIGHTS} nights'
+                continue
+
+            parsed.append((idx, (room_id, check_in_date, check_out_date)))
+
+        quotes = BookingService.check_availability_batch(
+            [stay for _, stay in parsed], breakdown_nights=self.MAX_BATCH_BREAKDOWN_NIGHTS
+        )
+
+        results = [None] * len(stays)
+        for idx, message in errors.items():
+            results[idx] = {
+                **self._stay_echo(stays[idx]),
+                'available': False, 'total_price': None, 'nightly_rates': None, 'error': message
+            }
+        for (idx, stay), quote in zip(parsed, quotes):
+            total_price = quote['total_price']
+            results[idx] = {
+                'room_id': stay[0],
+                'check_in': stay[1].isoformat(),
+                'check_out': stay[2].isoformat(),
+                **quote,
+                'total_price': str(total_price) if total_price is not None else None,
+            }
+
+        return Response({'results': results})
+
+    @staticmethod
+    def _stay_echo(item):
+        item = item if isinstance(item, dict) else {}
+        return {
+            'room_id': item.get('room_id'),
+            'check_in': item.get('check_in'),
+            'check_out': item.get('check_out'),
+        }
+
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated], url_path='my-bookings')
     def my_bookings(self, request):
-        """Get bookings for the authenticated user"""
-        bookings = Booking.objects.filter(guest=request.user).select_related('room').prefetch_related('room__images').order_by('-created_at')
-        serializer = self.get_serializer(bookings, many=True)
-        return Response(serializer.data)
+        """Get the authenticated user's bookings as compact summaries, newest first (paginated)"""
+        bookings = BookingSummarySerializer.with_room_summary(
+            Booking.objects.filter(guest=request.user)
+        ).order_by(*self.ordering)
+        page = self.paginate_queryset(bookings)
+        serializer = BookingSummarySerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['patch'], permission_classes=[IsAdminOrStaff])
     def update_status(self, request, pk=None):
         """Update booking status"""
         booking = self.get_object()
-        old_status = booking.status
         new_status = request.data.get('status')
 
         if new_status not in dict(Booking.Status.choices):
@@ -143,25 +324,7 @@ class BookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        booking.status = new_status
-        booking.save()
-
-        # Handle room availability based on status changes
-        if new_status == 'CANCELLED' and hasattr(booking, 'availability_period'):
-            # Delete busy period if booking is cancelled
-            booking.availability_period.all().delete()
-        elif new_status in ['CONFIRMED', 'PENDING'] and old_status == 'CANCELLED':
-            # Re-create busy period if booking is reactivated
-            RoomAvailability.objects.get_or_create(
-                room=booking.room,
-                start_date=booking.check_in_date,
-                end_date=booking.check_out_date,
-                defaults={
-                    'status': 'BUSY',
-                    'booking': booking,
-                    'notes': f'Auto-created for booking #{booking.id}'
-                }
-            )
+        booking = BookingService.update_booking(booking, status=new_status)
 
         serializer = self.get_serializer(booking)
         return Response(serializer.data)
@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction
+from rest_framework import serializers
+from rest_framework.fields import get_error_detail
+from apps.core.cache import bump_generation
+from apps.core.images import schedule_variants
+from apps.core.models import MediaFile
+
+
+class BulkImageUpload:
+    """
+    Add a batch of uploaded files and URLs to one parent (a room or a
+    gallery category) in a single transaction.
+
+    Files are validated (Pillow decode) and written to storage in a thread
+    pool, then every row is inserted with one bulk_create. bulk_create skips
+    save() and signals, so the primary flag, file references, cache
+    generation and variant generation are settled here, once per batch.
+    """
+
+    def __init__(self, model, serializer_class, parent_field, settle_primary=False):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.parent_field = parent_field
+        self.settle_primary = settle_primary
+        self.file_field = model._meta.get_field('image')
+
+    def store_file(self, image_field, file):
+        """Validate one upload and save it to storage; returns (name, errors)"""
+        try:
+            image = image_field.run_validation(file)
+        except serializers.ValidationError as exc:
+            return None, {'image': exc.detail}
+        except DjangoValidationError as exc:  # Raised by the Pillow check itself
+            return None, {'image': get_error_detail(exc)}
+        name = self.file_field.generate_filename(None, image.name)
+        return self.file_field.storage.save(name, image, max_length=self.file_field.max_length), None
+
+    def store_files(self, files):
+        fields = self.serializer_class().fields
+        workers = max(1, min(settings.IMAGE_UPLOAD_WORKERS, len(files)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda file: self.store_file(fields['image'], file), files))
+
+    def save(self, parent, files, urls):
+        """Returns (created images, errors); errors use the per-item serializer format"""
+        url_field = self.serializer_class().fields['image_url']
+        siblings = self.model.objects.filter(**{self.parent_field: parent})
+        # Next highest order; files first, then URLs, numbered by position
+        current_order = (siblings.aggregate(models.Max('order'))['order__max'] or 0) + 1
+
+        images, errors = [], []
+        stored = self.store_files(files)
+        for idx, (file, (name, file_errors)) in enumerate(zip(files, stored)):
+            if file_errors:
+                errors.append({'file': file.name, 'errors': file_errors})
+            else:
+                images.append(self.model(**{self.parent_field: parent}, image=name, order=current_order + idx))
+
+        for idx, url in enumerate(urls):
+            if not url:  # Skip empty URLs
+                continue
+            try:
+                url = url_field.run_validation(url)
+            except serializers.ValidationError as exc:
+                errors.append({'url': url, 'errors': {'image_url': exc.detail}})
+                continue
+            images.append(self.model(**{self.parent_field: parent}, image_url=url, order=current_order + len(files) + idx))
+
+        try:
+            with transaction.atomic():
+                if images and self.settle_primary and not siblings.filter(is_primary=True).exists():
+                    images[0].is_primary = True
+                created = self.model.objects.bulk_create(images)
+                MediaFile.acquire(
+                    (name for image in created for name in MediaFile.references_of(image).elements()),
+                    self.file_field.storage,
+                    {name: file for file, (name, _) in zip(files, stored) if name}
+                )
+                if created:
+                    label = self.model._meta.label
+                    transaction.on_commit(lambda: bump_generation(label))
+                for image in created:
+                    if image.image:
+                        schedule_variants(image)
+        except Exception:
+            MediaFile.discard([name for name, _ in stored if name], self.file_field.storage)
+            raise
+        return created, errors
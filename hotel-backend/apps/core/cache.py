@@ -0,0 +1,186 @@
+import hashlib
+import time
+from datetime import date
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+
+# Models whose writes invalidate cached API responses (app_label.ModelName)
+CACHE_GENERATION_MODELS = (
+    'rooms.Room',
+    'rooms.RoomImage',
+    'rooms.Amenity',
+    'rooms.RoomAvailability',
+    'core.GalleryImage',
+    'core.GalleryCategory',
+    'bookings.SeasonalPrice',
+    'bookings.Booking',
+)
+
+# Response headers kept with a cached body
+CACHED_HEADERS = ('Content-Type', 'Vary', 'Allow', 'ETag', 'Last-Modified')
+
+
+def generation_key(label: str) -> str:
+    return f'cache-generation:{label.lower()}'
+
+
+def get_generations(labels) -> list:
+    """
+    Current generation of each model, in order.
+
+    Generations are the time (in ns) of the model's last write, so they
+    double as a last-modified time. Missing ones (first use, or evicted)
+    start from the clock, which never repeats a value an older cached
+    response was stored under.
+    """
+    keys = [generation_key(label) for label in labels]
+    generations = cache.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), timeout=None)
+        generations.update(cache.get_many(missing))
+    return [generations.get(key, 0) for key in keys]
+
+
+def bump_generation(label: str):
+    """Invalidate every cached response that depends on the model"""
+    cache.set(generation_key(label), time.time_ns(), timeout=None)
+
+
+class CachedResponseMixin:
+    """
+    Cache anonymous GET responses of a viewset in the default cache.
+
+    Responses are keyed by the full URL (query string included) and the
+    Accept header, under the current generations of `cache_dependencies`.
+    Saving or deleting any of those models bumps its generation (see
+    apps.core.signals), so stale entries are simply never looked up again
+    and age out after API_CACHE_TIMEOUT. Requests carrying credentials are
+    never cached, since staff see inactive rooms and categories.
+    """
+    cache_dependencies = ()
+    cache_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_cacheable_request(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, headers = cached
+            response = HttpResponse(content)
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            # Revalidation against the stored validators costs no queries
+            return get_conditional_response(
+                request,
+                etag=response.get('ETag'),
+                last_modified=parse_http_date_safe(response.get('Last-Modified', '')),
+                response=response,
+            )
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            response.render()
+            headers = {header: response[header] for header in CACHED_HEADERS if header in response}
+            cache.set(key, (response.content, headers), settings.API_CACHE_TIMEOUT)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def is_cacheable_request(self, request):
+        action = getattr(self, 'action_map', {}).get('get')
+        return (
+            request.method == 'GET'
+            and action in self.cache_actions
+            and 'HTTP_AUTHORIZATION' not in request.META
+        )
+
+    def get_response_cache_key(self, request):
+        generations = '.'.join(str(generation) for generation in get_generations(self.cache_dependencies))
+        url = f"{request.build_absolute_uri()}|{request.META.get('HTTP_ACCEPT', '')}"
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        return f'api-response:{generations}:{digest}'
+
+
+class NotModified(Exception):
+    """Raised from initial() to answer a conditional GET with a 304"""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validators for list and retrieve, computed without
+    serializing anything.
+
+    The validators come from one aggregate query over the filtered queryset
+    (MAX(updated_at) and COUNT(*)), the full URL, the Accept header, today's
+    date (availability flags roll over at midnight) and the generations of
+    `cache_dependencies`, which cover related models such as images and
+    amenities. A matching If-None-Match (or a fresh If-Modified-Since) gets a
+    304 before the handler runs.
+    """
+    cache_dependencies = ()
+    conditional_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.conditional_validators = None
+        if request.method in ('GET', 'HEAD') and self.action in self.conditional_actions:
+            self.conditional_validators = self.get_conditional_validators(request)
+            etag, last_modified = self.conditional_validators
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                raise NotModified(not_modified)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'conditional_validators', None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def get_conditional_validators(self, request):
+        """Return (etag, last_modified timestamp or None)"""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        aggregates = {'count': Count('pk')}
+        if any(field.name == 'updated_at' for field in queryset.model._meta.concrete_fields):
+            aggregates['last_updated'] = Max('updated_at')
+        stats = queryset.order_by().aggregate(**aggregates)
+
+        generations = get_generations(self.cache_dependencies)
+        timestamps = [generation / 1e9 for generation in generations]
+        if stats.get('last_updated'):
+            timestamps.append(stats['last_updated'].timestamp())
+        last_modified = int(max(timestamps)) if timestamps else None
+
+        fingerprint = '|'.join(str(part) for part in (
+            request.build_absolute_uri(),
+            request.META.get('HTTP_ACCEPT', ''),
+            date.today(),
+            stats['count'],
+            stats.get('last_updated') and stats['last_updated'].isoformat(),
+            *generations,
+        ))
+        return f'"{hashlib.sha256(fingerprint.encode()).hexdigest()}"', last_modified
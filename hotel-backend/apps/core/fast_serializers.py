@@ -0,0 +1,136 @@
+import decimal
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework.response import Response
+from apps.core.fieldsets import EXPAND_PARAM, FIELDS_PARAM
+from apps.core.image_variants import image_srcset
+from apps.core.models import GalleryImage
+
+
+def decimal_formatter(model, field_name):
+    """Format a model DecimalField the way DRF's DecimalField does ('150.00')"""
+    field = model._meta.get_field(field_name)
+    exponent = decimal.Decimal('.1') ** field.decimal_places
+    context = decimal.getcontext().copy()
+    context.prec = field.max_digits
+
+    def format_decimal(value):
+        if value is None:
+            return None
+        return f'{value.quantize(exponent, context=context):f}'
+    return format_decimal
+
+
+def format_datetime(value):
+    """ISO 8601 in the current timezone, UTC as 'Z', as DRF's DateTimeField"""
+    if not value:
+        return None
+    value = value.astimezone(timezone.get_current_timezone()).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def choice_labels(model, field_name):
+    """{value: label} for a choice field, as used by get_FOO_display()"""
+    return {value: str(label) for value, label in model._meta.get_field(field_name).flatchoices}
+
+
+class MediaUrls:
+    """
+    File field URLs for one response, as DRF's FileField renders them.
+
+    For file system storage the absolute media prefix is built once and file
+    names are appended to it, instead of a storage.url() and
+    build_absolute_uri() call per file.
+    """
+
+    def __init__(self, model, field_name, request=None):
+        self.storage = model._meta.get_field(field_name).storage
+        self.request = request
+        self.prefix = None
+        if isinstance(self.storage, FileSystemStorage):
+            self.prefix = self.storage.url('')
+            if request is not None:
+                self.prefix = request.build_absolute_uri(self.prefix)
+
+    def url(self, name):
+        if not name:
+            return None
+        if self.prefix is not None:
+            return self.prefix + filepath_to_uri(name).lstrip('/')
+        url = self.storage.url(name)
+        return self.request.build_absolute_uri(url) if self.request is not None else url
+
+
+class FastListSerializer:
+    """
+    Read-only list serializer built from .values() rows.
+
+    Subclasses mirror a DRF serializer's output exactly (same keys, order and
+    formatting) while skipping model instances and per-field machinery: they
+    set `fields`, the columns to select, and define to_representation(rows),
+    which turns a page of those rows into the response data.
+    Used for list endpoints when settings.FAST_LIST_SERIALIZERS is on.
+    """
+    fields = ()
+
+    def __init__(self, context=None):
+        self.context = context or {}
+        self.request = self.context.get('request')
+
+    def rows(self, queryset):
+        """The values() queryset to paginate and render (relations are read per page)"""
+        return queryset.prefetch_related(None).values(*self.fields)
+
+
+class GalleryImageFastSerializer(FastListSerializer):
+    """Mirrors GalleryImageSerializer"""
+    fields = (
+        'id', 'category_id', 'category__name', 'image', 'image_url', 'variants',
+        'alt_text', 'order', 'is_active', 'created_at', 'updated_at',
+    )
+
+    def to_representation(self, rows):
+        media = MediaUrls(GalleryImage, 'image', self.request)
+        data = []
+        for row in rows:
+            image = media.url(row['image'])
+            data.append({
+                'id': row['id'],
+                'category': row['category_id'],
+                'category_name': row['category__name'],
+                'image': image,
+                'image_url': row['image_url'],
+                'image_display': image or row['image_url'],
+                'srcset': image_srcset(row['variants'], media.url),
+                'alt_text': row['alt_text'],
+                'order': row['order'],
+                'is_active': row['is_active'],
+                'created_at': format_datetime(row['created_at']),
+                'updated_at': format_datetime(row['updated_at']),
+            })
+        return data
+
+
+class FastListMixin:
+    """
+    Serve `list` through `fast_serializer_class` when FAST_LIST_SERIALIZERS
+    is enabled. The output is identical to the regular serializer's.
+    Sparse fieldset requests (?fields= / ?expand=) take the regular path.
+    """
+    fast_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        sparse = FIELDS_PARAM in request.query_params or EXPAND_PARAM in request.query_params
+        if not settings.FAST_LIST_SERIALIZERS or self.fast_serializer_class is None or sparse:
+            return super().list(request, *args, **kwargs)
+
+        serializer = self.fast_serializer_class(context=self.get_serializer_context())
+        rows = serializer.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(serializer.to_representation(page))
+        return Response(serializer.to_representation(rows))
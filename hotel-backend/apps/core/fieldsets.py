@@ -0,0 +1,158 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_fieldset(value):
+    """'id,name, room.name' -> {'id', 'name', 'room.name'}; None when the parameter is absent"""
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Serializer mixin for ?fields= and ?expand=.
+
+    - fields: names to keep; dotted names reach into an expanded relation
+      (room.name). None keeps every field.
+    - expand: relations in `expandable_fields` to embed. None keeps the
+      legacy output (everything embedded); otherwise relations that are not
+      listed are rendered as their primary key.
+
+    `field_sources` names the model paths read by fields that are not plain
+    model attributes (method fields, properties), so views can trim the
+    query to what the kept fields need (see SparseFieldsetViewMixin).
+    """
+    expandable_fields = ()
+    field_sources = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            keep = {name.split('.', 1)[0] for name in fields}
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+        for name in self.expandable_fields:
+            if name not in self.fields:
+                continue
+            if expand is not None and name not in expand:
+                many = isinstance(self.fields[name], serializers.ListSerializer)
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, many=many)
+                continue
+            nested = {field[len(name) + 1:] for field in fields or () if field.startswith(f'{name}.')}
+            if nested:
+                field = self.fields[name]
+                self.fields[name] = type(field)(*field._args, **{**field._kwargs, 'fields': nested})
+
+    def get_model_paths(self, prefix=''):
+        """Model paths (Django lookups such as 'name', 'room__slug', 'images') read by the kept fields"""
+        paths = set()
+        for name, field in self.fields.items():
+            if name in self.field_sources:
+                paths.update(prefix + path for path in self.field_sources[name])
+            elif isinstance(field, SparseFieldsetSerializerMixin):
+                paths.update(field.get_model_paths(f"{prefix}{field.source.replace('.', '__')}__"))
+            elif field.source != '*':
+                source = field.source
+                if source.startswith('get_') and source.endswith('_display'):
+                    source = source[len('get_'):-len('_display')]
+                paths.add(prefix + source.replace('.', '__'))
+        return paths
+
+
+def resolve_model_paths(model, paths):
+    """
+    Split model paths into (columns for only(), relation paths needing a
+    prefetch). Returns None when a path is not a model field (a property,
+    say), in which case columns cannot be trimmed safely.
+    """
+    columns, relations = {model._meta.pk.name}, set()
+    for path in paths:
+        current, walked = model, []
+        for part in path.split('__'):
+            try:
+                field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                return None
+            walked.append(part)
+            if field.many_to_many or field.one_to_many:
+                relations.add('__'.join(walked))
+                break
+            if field.is_relation and len(walked) < len(path.split('__')):
+                current = field.related_model
+                continue
+            columns.add('__'.join(walked))
+            break
+    return columns, relations
+
+
+class SparseFieldsetViewMixin:
+    """
+    Pass ?fields= / ?expand= to the serializer and trim the queryset to match:
+    only() the needed columns and keep only the select_related /
+    prefetch_related lookups the kept fields read.
+    """
+    sparse_actions = ('list', 'retrieve')
+
+    def get_sparse_kwargs(self):
+        if self.action not in self.sparse_actions:
+            return {}
+        params = self.request.query_params
+        return {
+            'fields': parse_fieldset(params.get(FIELDS_PARAM)),
+            'expand': parse_fieldset(params.get(EXPAND_PARAM)),
+        }
+
+    def get_serializer(self, *args, **kwargs):
+        if issubclass(self.get_serializer_class(), SparseFieldsetSerializerMixin):
+            kwargs = {**self.get_sparse_kwargs(), **kwargs}
+        return super().get_serializer(*args, **kwargs)
+
+    def trim_queryset(self, queryset, select_related=(), prefetch_related=(), required=()):
+        """
+        Apply the given relations, dropping those the requested fields do not
+        read, and defer unused columns. `required` lists columns the view
+        itself reads. Without ?fields= / ?expand= everything is applied.
+        """
+        sparse = self.get_sparse_kwargs()
+        serializer_class = self.get_serializer_class()
+        # Cursor pagination reads the ordering columns off the last rows
+        required = {*required, *(field.lstrip('-') for field in getattr(self, 'ordering', None) or ())}
+        if not any(value is not None for value in sparse.values()) or \
+                not issubclass(serializer_class, SparseFieldsetSerializerMixin):
+            if select_related:
+                queryset = queryset.select_related(*select_related)
+            return queryset.prefetch_related(*prefetch_related)
+
+        serializer = serializer_class(context=self.get_serializer_context(), **sparse)
+        paths = serializer.get_model_paths() | set(required)
+        resolved = resolve_model_paths(queryset.model, paths)
+        if resolved is None:
+            needed = paths
+        else:
+            columns, relations = resolved
+            needed = columns | relations
+
+        def is_needed(lookup):
+            return any(path == lookup or path.startswith(f'{lookup}__') for path in needed)
+
+        def reads_through(lookup):
+            # A relation rendered as its pk only needs the FK column, not a join
+            return any(path.startswith(f'{lookup}__') for path in needed)
+
+        joined = [lookup for lookup in select_related if reads_through(lookup)]
+        if joined:  # select_related() without arguments would join every FK
+            queryset = queryset.select_related(*joined)
+        queryset = queryset.prefetch_related(*[
+            lookup for lookup in prefetch_related
+            if is_needed(lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup)
+        ])
+        if resolved is not None:
+            # Joined relations must not be deferred themselves
+            queryset = queryset.only(*columns, *joined)
+        return queryset
@@ -0,0 +1,57 @@
+"""
+Image variant rendering with Pillow.
+
+Kept free of Django imports: worker processes import this module to run
+render_variants() without setting Django up.
+"""
+import io
+import posixpath
+from PIL import Image, ImageOps
+
+# Variant formats: (file extension, Pillow format, save options)
+VARIANT_FORMATS = {
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def render_variants(data, widths):
+    """
+    Resize an encoded image to each width in every variant format, never
+    upscaling. Runs in a worker process, so it takes and returns plain bytes.
+
+    Returns (original width, {format: {width: encoded bytes}}).
+    """
+    with Image.open(io.BytesIO(data)) as opened:
+        source = ImageOps.exif_transpose(opened)
+        has_alpha = 'A' in source.getbands() or 'transparency' in source.info
+        source = source.convert('RGBA' if has_alpha else 'RGB')
+
+    rendered = {}
+    for width in sorted({min(width, source.width) for width in widths}):
+        height = max(1, round(source.height * width / source.width))
+        resized = source if width == source.width else source.resize((width, height), Image.Resampling.LANCZOS)
+        for name, (_, image_format, options) in VARIANT_FORMATS.items():
+            image = resized.convert('RGB') if image_format == 'JPEG' else resized
+            buffer = io.BytesIO()
+            image.save(buffer, image_format, **options)
+            rendered.setdefault(name, {})[width] = buffer.getvalue()
+    return source.width, rendered
+
+
+def variant_name(source_name, width, extension):
+    """room_images/a.jpg -> room_images/variants/a_320w.webp"""
+    directory, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f'{stem}_{width}w.{extension}')
+
+
+def image_srcset(variants, url):
+    """{'webp': '<url> 320w, <url> 640w', 'jpeg': ...}; `url` maps a storage name to its URL"""
+    return {
+        name: ', '.join(
+            f'{url(stored)} {width}w'
+            for width, stored in sorted(variants[name].items(), key=lambda item: int(item[0]))
+        )
+        for name in VARIANT_FORMATS if variants.get(name)
+    }
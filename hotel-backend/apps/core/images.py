@@ -0,0 +1,139 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from rest_framework import serializers
+from apps.core.cache import bump_generation
+from apps.core.fast_serializers import MediaUrls
+from apps.core.models import MediaFile
+from apps.core.image_variants import VARIANT_FORMATS, image_srcset, render_variants, variant_name
+
+logger = logging.getLogger(__name__)
+
+# Models with an `image` file field and a `variants` JSON field
+IMAGE_VARIANT_MODELS = ('rooms.RoomImage', 'core.GalleryImage')
+
+
+def needs_variants(instance):
+    """True when the uploaded file has no variants yet (or they belong to a replaced file)"""
+    return bool(instance.image) and instance.variants.get('source') != instance.image.name
+
+
+def variant_files(variants):
+    return [stored for name in VARIANT_FORMATS for stored in variants.get(name, {}).values()]
+
+
+def store_variants(instance, width, rendered):
+    """
+    Save rendered variants next to the original and record them on the row.
+    Uses QuerySet.update(), so file references and the cache generation are
+    updated here rather than by signals.
+    """
+    storage = instance.image.storage
+    source = instance.image.name
+    variants, sources = {'source': source, 'width': width}, {}
+    for name, by_width in rendered.items():
+        extension = VARIANT_FORMATS[name][0]
+        variants[name] = {}
+        for size, data in sorted(by_width.items()):
+            content = ContentFile(data)
+            stored_name = storage.save(variant_name(source, size, extension), content)
+            variants[name][str(size)] = stored_name
+            sources[stored_name] = content
+
+    model = type(instance)
+    with transaction.atomic():
+        # The image may have been replaced or deleted while rendering
+        stored = model.objects.filter(pk=instance.pk, image=source).update(variants=variants)
+        if stored:
+            MediaFile.acquire(variant_files(variants), storage, sources)
+            MediaFile.release(variant_files(instance.variants), storage)
+    if not stored:
+        MediaFile.discard(variant_files(variants), storage)
+        return False
+
+    instance.variants = variants
+    bump_generation(model._meta.label)
+    return True
+
+
+def read_image(instance):
+    with instance.image.open('rb') as file:
+        return file.read()
+
+
+def generate_variants(instance, pool=None):
+    """Render, store and record the variants of one image (blocking)"""
+    data, widths = read_image(instance), settings.IMAGE_VARIANT_WIDTHS
+    if pool is None:
+        width, rendered = render_variants(data, widths)
+    else:
+        width, rendered = pool.submit(render_variants, data, widths).result()
+    return store_variants(instance, width, rendered)
+
+
+def create_process_pool(workers):
+    # spawn: forking a threaded server process can deadlock the child
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def background_executors():
+    """(dispatch threads, render processes), created on first use and shared by the process"""
+    with _executors_lock:
+        if not _executors:
+            workers = settings.IMAGE_VARIANT_WORKERS
+            _executors['threads'] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variants')
+            _executors['processes'] = create_process_pool(workers)
+        return _executors['threads'], _executors['processes']
+
+
+def generate_variants_for(label, pk, pool=None):
+    """Generate variants for a stored image by model label and pk, logging failures"""
+    try:
+        instance = apps.get_model(label).objects.filter(pk=pk).first()
+        if instance is not None and needs_variants(instance):
+            generate_variants(instance, pool)
+    except Exception:
+        logger.exception('Could not generate image variants for %s %s', label, pk)
+    finally:
+        if pool is not None:
+            connections.close_all()  # this thread's connections
+
+
+def schedule_variants(instance):
+    """
+    Generate the image's variants once the transaction commits: in a
+    background process pool, or inline when IMAGE_VARIANT_WORKERS is 0.
+    """
+    label, pk = instance._meta.label, instance.pk
+
+    def run():
+        if settings.IMAGE_VARIANT_WORKERS <= 0:
+            generate_variants_for(label, pk)
+            return
+        threads, processes = background_executors()
+        threads.submit(generate_variants_for, label, pk, processes)
+
+    transaction.on_commit(run)
+
+
+class SrcsetField(serializers.ReadOnlyField):
+    """An image's variants as {format: srcset string} (empty until they are generated)"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('source', 'variants')
+        super().__init__(**kwargs)
+
+    def to_representation(self, variants):
+        # One URL builder per response: list children share this field
+        if getattr(self, 'media', None) is None:
+            self.media = MediaUrls(self.parent.Meta.model, 'image', self.context.get('request'))
+        return image_srcset(variants or {}, self.media.url)
@@ -0,0 +1,90 @@
+import io
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+from apps.core.bulk_images import BulkImageUpload
+from apps.rooms.models import Room, RoomImage
+from apps.rooms.serializers import RoomImageCreateSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Time a synthetic bulk image upload to a room: the former one-serializer-save-per-file '
+        'loop against BulkImageUpload. Each run writes to its own temporary MEDIA_ROOT; nothing is kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', type=int, default=100)
+        parser.add_argument('--width', type=int, default=1600)
+        parser.add_argument('--height', type=int, default=1200)
+        parser.add_argument('--workers', type=int, default=4, help='IMAGE_UPLOAD_WORKERS for the bulk path')
+
+    def handle(self, *args, **options):
+        payloads = self.synthesize(options)
+        request = APIRequestFactory().post('/api/rooms/', HTTP_HOST='localhost')
+        with override_settings(IMAGE_UPLOAD_WORKERS=options['workers']):
+            per_file = self.timed(lambda room: self.per_file(room, self.uploads(payloads), request))
+            bulk = self.timed(lambda room: BulkImageUpload(
+                RoomImage, RoomImageCreateSerializer, parent_field='room', settle_primary=True
+            ).save(room, self.uploads(payloads), []))
+
+        size = sum(len(payload) for payload in payloads) / len(payloads) / 1024
+        self.stdout.write(
+            f"{len(payloads)} images ({options['width']}x{options['height']}, {size:.0f} KB avg)   "
+            f"per-file {per_file * 1000:8.1f} ms   bulk {bulk * 1000:8.1f} ms   "
+            f"speedup {per_file / bulk:5.1f}x"
+        )
+
+    def synthesize(self, options):
+        payloads = []
+        for index in range(options['images']):
+            image = Image.linear_gradient('L').resize((options['width'], options['height']))
+            image = Image.merge('RGB', (image, image.rotate(90), Image.new('L', image.size, index % 256)))
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=90)
+            payloads.append(buffer.getvalue())
+        return payloads
+
+    def uploads(self, payloads):
+        return [
+            SimpleUploadedFile(f'bench_{index}.jpg', payload, content_type='image/jpeg')
+            for index, payload in enumerate(payloads)
+        ]
+
+    def per_file(self, room, files, request):
+        """The former bulk_add_images body: one serializer, decode and INSERT per file"""
+        for idx, file in enumerate(files):
+            serializer = RoomImageCreateSerializer(
+                data={'room': room.id, 'image': file, 'order': idx + 1}, context={'request': request}
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+    def timed(self, upload):
+        # A fresh MEDIA_ROOT per run: with content-addressed storage a second
+        # run into the same directory would find every file already stored
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root), transaction.atomic():
+                room = Room.objects.create(
+                    name='Benchmark upload room', description='x', base_price_per_night=Decimal('100.00')
+                )
+                started = time.perf_counter()
+                upload(room)
+                elapsed = time.perf_counter() - started
+                raise Rollback
+        except Rollback:
+            return elapsed
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
@@ -0,0 +1,98 @@
+import statistics
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+from apps.core.fast_serializers import GalleryImageFastSerializer
+from apps.core.models import GalleryCategory, GalleryImage
+from apps.core.serializers import GalleryImageSerializer
+from apps.rooms.fast_serializers import RoomListFastSerializer
+from apps.rooms.models import Amenity, Room, RoomImage
+from apps.rooms.serializers import RoomListSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the DRF and fast (.values()) list serializers for rooms and gallery '
+        'images on generated data, checking the JSON is identical. Nothing is kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=100)
+        parser.add_argument('--images', type=int, default=5, help='Images per room')
+        parser.add_argument('--gallery', type=int, default=200, help='Gallery images')
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options)
+                request = APIRequestFactory().get('/api/rooms/', HTTP_HOST='localhost')
+                context = {'request': request}
+
+                rooms = Room.objects.prefetch_related(RoomListSerializer.images_prefetch(), 'amenities')
+                self.compare(
+                    'rooms', options['iterations'],
+                    lambda: RoomListSerializer(rooms.all(), many=True, context=context).data,
+                    lambda: self.fast(RoomListFastSerializer(context=context), Room.objects.all()),
+                )
+
+                gallery = GalleryImage.objects.all()
+                self.compare(
+                    'gallery', options['iterations'],
+                    lambda: GalleryImageSerializer(gallery.all(), many=True, context=context).data,
+                    lambda: self.fast(GalleryImageFastSerializer(context=context), GalleryImage.objects.all()),
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, options):
+        amenities = [Amenity.objects.create(name=f'Benchmark amenity {index}', icon='star') for index in range(4)]
+        for index in range(options['rooms']):
+            room = Room.objects.create(
+                name=f'Benchmark room {index}',
+                description='A long description. ' * 50,
+                special_perks='Perks. ' * 20,
+                base_price_per_night=Decimal('120.50'),
+                size_sqm=Decimal('32.5'),
+            )
+            room.amenities.set(amenities)
+            RoomImage.objects.bulk_create([
+                RoomImage(room=room, image=f'room_images/bench_{index}_{order}.jpg', order=order, is_primary=order == 0)
+                for order in range(options['images'])
+            ])
+
+        category = GalleryCategory.objects.create(name='Benchmark category')
+        GalleryImage.objects.bulk_create([
+            GalleryImage(category=category, image=f'gallery_images/bench {index}.jpg', alt_text='Benchmark', order=index)
+            for index in range(options['gallery'])
+        ])
+
+    def fast(self, serializer, queryset):
+        return serializer.to_representation(serializer.rows(queryset))
+
+    def compare(self, label, iterations, regular, fast):
+        renderer = JSONRenderer()
+        if renderer.render(regular()) != renderer.render(fast()):
+            raise CommandError(f'{label}: fast serializer output differs from the DRF serializer')
+
+        timings = {}
+        for name, build in (('drf', regular), ('fast', fast)):
+            samples = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                renderer.render(build())
+                samples.append(time.perf_counter() - started)
+            timings[name] = statistics.median(samples)
+
+        self.stdout.write(
+            f"{label:8} drf {timings['drf'] * 1000:8.2f} ms   fast {timings['fast'] * 1000:8.2f} ms   "
+            f"speedup {timings['drf'] / timings['fast']:5.1f}x   (identical JSON)"
+        )
@@ -0,0 +1,91 @@
+from collections import Counter
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from apps.core.cache import bump_generation
+from apps.core.images import IMAGE_VARIANT_MODELS
+from apps.core.models import MediaFile
+from apps.core.storage import ContentAddressedStorage, content_name, file_digest, is_content_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Move room and gallery media (uploads and their variants) into content-addressed '
+        'storage, folding identical files into one, then recount MediaFile references'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report duplicates without changing anything')
+
+    def handle(self, *args, **options):
+        models = [apps.get_model(label) for label in IMAGE_VARIANT_MODELS]
+        storage = models[0]._meta.get_field('image').storage
+        if not isinstance(storage, ContentAddressedStorage):
+            raise CommandError('The image storage is not content-addressed (see STORAGES in settings)')
+
+        rows = {model: list(model.objects.only('image', 'variants')) for model in models}
+        legacy = sorted({
+            name for images in rows.values() for image in images
+            for name in MediaFile.references_of(image) if not is_content_name(name)
+        })
+
+        # Hash each legacy file once; rows sharing a file share the mapping
+        renamed, sizes, missing = {}, {}, []
+        for name in legacy:
+            if not storage.exists(name):
+                missing.append(name)
+                continue
+            with storage.open(name, 'rb') as file:
+                sizes[name] = storage.size(name)
+                target = content_name(file_digest(file), name)
+                if not options['dry_run']:
+                    target = storage.save(name, file)
+            renamed[name] = target
+
+        kept = {target: sizes[name] for name, target in renamed.items()}
+        reclaimed = sum(sizes.values()) - sum(kept.values())
+        self.stdout.write(
+            f'{len(renamed)} files, {len(kept)} distinct contents, {reclaimed / 1024 / 1024:.1f} MB reclaimable'
+            + (f', {len(missing)} missing' if missing else '')
+        )
+        for name in missing:
+            self.stderr.write(f'Missing file: {name}')
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            for model, images in rows.items():
+                changed = [image for image in images if self.rename(image, renamed)]
+                model.objects.bulk_update(changed, ['image', 'variants'], batch_size=500)
+                if changed:
+                    label = model._meta.label
+                    transaction.on_commit(lambda: bump_generation(label))
+
+            # Recount from the rows, which also repairs any drift
+            references = sum((MediaFile.references_of(image) for images in rows.values() for image in images), Counter())
+            MediaFile.objects.all().delete()
+            MediaFile.objects.bulk_create(
+                [MediaFile(name=name, references=count) for name, count in references.items()], batch_size=500
+            )
+
+        for name in renamed:
+            storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(f'Moved {len(renamed)} files; {len(references)} referenced files tracked'))
+
+    def rename(self, image, renamed):
+        """Point a row at the content-addressed names; True when it changed"""
+        changed = False
+        if image.image and image.image.name in renamed:
+            image.image.name = renamed[image.image.name]
+            changed = True
+
+        variants = dict(image.variants or {})
+        for key, value in variants.items():
+            if isinstance(value, dict):
+                variants[key] = {width: renamed.get(name, name) for width, name in value.items()}
+            elif key == 'source' and value in renamed:
+                variants[key] = renamed[value]
+        if variants != (image.variants or {}):
+            image.variants = variants
+            changed = True
+        return changed
@@ -0,0 +1,59 @@
+import os
+from concurrent.futures import as_completed
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.core.images import (
+    IMAGE_VARIANT_MODELS, create_process_pool, needs_variants, read_image, store_variants
+)
+from apps.core.image_variants import render_variants
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate resized WebP/JPEG variants for uploaded room and gallery images '
+        'that have none (or whose file was replaced), rendering in parallel processes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants for every uploaded image')
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Rendering processes (default: one per CPU)'
+        )
+
+    def handle(self, *args, **options):
+        widths = settings.IMAGE_VARIANT_WIDTHS
+        # Bounds the source files held in memory at once
+        window = options['workers'] * 4
+
+        with create_process_pool(options['workers']) as pool:
+            for label in IMAGE_VARIANT_MODELS:
+                images = [
+                    image for image in apps.get_model(label).objects.exclude(image='').exclude(image__isnull=True)
+                    if options['force'] or needs_variants(image)
+                ]
+                generated = failed = 0
+                for start in range(0, len(images), window):
+                    futures = {}
+                    for image in images[start:start + window]:
+                        try:
+                            futures[pool.submit(render_variants, read_image(image), widths)] = image
+                        except OSError as exc:
+                            failed += 1
+                            self.stderr.write(f'{label} {image.pk}: {exc}')
+
+                    for future in as_completed(futures):
+                        image = futures[future]
+                        try:
+                            width, rendered = future.result()
+                        except Exception as exc:
+                            failed += 1
+                            self.stderr.write(f'{label} {image.pk}: {exc}')
+                            continue
+                        generated += store_variants(image, width, rendered)
+
+                self.stdout.write(self.style.SUCCESS(
+                    f'{label}: generated variants for {generated} of {len(images)} images'
+                    + (f', {failed} failed' if failed else '')
+                ))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.core.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete resumable uploads untouched for UPLOAD_SESSION_TTL_HOURS (with their part files) '
+        'and completed upload records'
+    )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+
+        purged = 0
+        for session in stale.iterator():
+            session.delete_file()
+            purged += 1
+        stale.delete()
+        self.stdout.write(self.style.SUCCESS(f'Purged {purged} upload sessions'))
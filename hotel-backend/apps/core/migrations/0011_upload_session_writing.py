@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_upload_session_completing'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('WRITING', 'Writing'), ('COMPLETING', 'Completing'), ('COMPLETE', 'Complete')], default='PENDING', max_length=20),
+        ),
+    ]
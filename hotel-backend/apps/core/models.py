@@ -1,4 +1,8 @@
-from django.db import models
+import uuid
+from collections import Counter
+from pathlib import Path
+from django.conf import settings
+from django.db import models, transaction
 from django.utils.text import slugify
 
 
@@ -40,6 +44,9 @@ class ContactMessage(models.Model):
     class Meta:
         db_table = 'contact_messages'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', '-id']),  # keyset pagination
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.subject}"
@@ -54,6 +61,8 @@ class GalleryImage(models.Model):
     )
     image = models.ImageField(upload_to='gallery_images/', null=True, blank=True)
     image_url = models.URLField(max_length=500, blank=True)  # Optional URL fallback
+    # Resized WebP/JPEG copies of `image`, see apps.core.images
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     alt_text = models.CharField(max_length=200, blank=True, help_text="Alternative text for accessibility")
     order = models.PositiveIntegerField(default=0)
     is_active = models.BooleanField(default=True)
@@ -73,3 +82,169 @@ class GalleryImage(models.Model):
         if self.image:
             return self.image.url
         return self.image_url
+
+
+class MediaFile(models.Model):
+    """
+    A stored media file and the number of image references to it.
+
+    RoomImage and GalleryImage rows reference their `image` file and every
+    file in `variants`. With content-addressed storage several rows can share
+    a file, so it is deleted only once the last reference is released.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    references = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'media_files'
+
+    def __str__(self):
+        return f"{self.name} ({self.references} references)"
+
+    @staticmethod
+    def references_of(image):
+        """Storage names referenced by an image row (the upload and its variants)"""
+        if image is None:
+            return Counter()
+        names = Counter()
+        if image.image:
+            names[image.image.name] += 1
+        for value in (image.variants or {}).values():
+            if isinstance(value, dict):
+                names.update(value.values())
+        return names
+
+    @classmethod
+    def acquire(cls, names, storage=None, sources=None):
+        """
+        Add references; `names` is an iterable (or Counter) of storage names.
+
+        `sources` maps names that were just saved to their content. Content
+        addressed storage hands out the name of a file already on disk, which a
+        concurrent release may delete before this reference exists, so such a
+        file is written again from its content once the transaction commits.
+        """
+        counts = Counter(names)
+        if not counts:
+            return
+        with transaction.atomic():
+            known = set(cls.objects.filter(name__in=counts).values_list('name', flat=True))
+            by_count = {}
+            for name in known:
+                by_count.setdefault(counts[name], []).append(name)
+            for count, group in by_count.items():
+                cls.objects.filter(name__in=group).update(references=models.F('references') + count)
+            cls.objects.bulk_create([
+                cls(name=name, references=count) for name, count in counts.items() if name not in known
+            ])
+        if sources:
+            transaction.on_commit(lambda: cls.restore(sources, storage))
+
+    @classmethod
+    def release(cls, names, storage):
+        """Drop references; files left without any are deleted once the transaction commits"""
+        counts = Counter(names)
+        if not counts:
+            return
+        with transaction.atomic():
+            by_count = {}
+            for name, count in counts.items():
+                by_count.setdefault(count, []).append(name)
+            for count, group in by_count.items():
+                cls.objects.filter(name__in=group).update(references=models.F('references') - count)
+            orphans = cls.objects.filter(name__in=counts, references__lte=0)
+            names = list(orphans.values_list('name', flat=True))
+            orphans.delete()
+        # Another transaction may have acquired a name since; discard() checks again
+        transaction.on_commit(lambda: cls.discard(names, storage))
+
+    @staticmethod
+    def restore(sources, storage):
+        """Save the content of any of `sources` (name: content) whose file has gone"""
+        for name, content in sources.items():
+            if not storage.exists(name):
+                content.seek(0)
+                storage.save(name, content)
+
+    @classmethod
+    def discard(cls, names, storage):
+        """Delete stored files that turned out unused, unless something references them"""
+        names = set(names)
+        referenced = set(cls.objects.filter(name__in=names).values_list('name', flat=True))
+        for name in names - referenced:
+            storage.delete(name)
+
+
+class UploadSession(models.Model):
+    """
+    A resumable chunked upload of one image file.
+
+    Chunks are written straight into a part file under UPLOAD_SESSION_DIR;
+    `received` is the length of the contiguous prefix written so far, i.e.
+    where the client resumes. A chunk claims its offset (WRITING) before it
+    touches the file, so only one request writes at a time. On completion the
+    file becomes a RoomImage or GalleryImage of the parent (room or gallery
+    category).
+    """
+
+    class Target(models.TextChoices):
+        ROOM_IMAGE = 'ROOM_IMAGE', 'Room Image'
+        GALLERY_IMAGE = 'GALLERY_IMAGE', 'Gallery Image'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        WRITING = 'WRITING', 'Writing'
+        COMPLETING = 'COMPLETING', 'Completing'
+        COMPLETE = 'COMPLETE', 'Complete'
+
+    # Bytes copied from the request stream per read
+    COPY_BUFFER = 64 * 1024
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey('users.CustomUser', on_delete=models.CASCADE, related_name='upload_sessions')
+    target = models.CharField(max_length=20, choices=Target.choices)
+    parent_id = models.PositiveIntegerField(help_text="Room or gallery category receiving the image")
+    attributes = models.JSONField(default=dict, blank=True)  # alt_text, order, ... for the image
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    image_id = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'upload_sessions'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes, {self.status})"
+
+    @property
+    def path(self):
+        return Path(settings.UPLOAD_SESSION_DIR) / f'{self.pk}.part'
+
+    def create_file(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch()
+
+    def delete_file(self):
+        self.path.unlink(missing_ok=True)
+
+    def write_chunk(self, stream, offset, length):
+        """
+        Copy `length` bytes of `stream` into the part file at `offset`,
+        COPY_BUFFER at a time. Returns the bytes written, which are fewer when
+        the client disconnects mid-chunk (the prefix is still usable).
+        """
+        written = 0
+        with open(self.path, 'r+b') as file:
+            file.seek(offset)
+            while written < length:
+                data = stream.read(min(self.COPY_BUFFER, length - written))
+                if not data:
+                    break
+                file.write(data)
+                written += len(data)
+        return written
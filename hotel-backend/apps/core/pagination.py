@@ -0,0 +1,38 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CursorOrPageNumberPagination(CursorPagination):
+    """
+    Keyset (cursor) pagination by default, page numbers on request.
+
+    Cursor pages seek on the view's `ordering` (e.g. ('-created_at', '-id')),
+    which should be backed by a matching composite index, so deep pages cost
+    the same as the first one and no COUNT(*) is run. Clients that still need
+    page numbers and a total count opt in by sending ?page=N.
+    """
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if PageNumberPagination.page_query_param in request.query_params:
+            self.page_number_paginator = PageNumberPagination()
+            return self.page_number_paginator.paginate_queryset(queryset, request, view)
+
+        self.page_number_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_ordering(self, request, queryset, view):
+        # Without an OrderingFilter on the view, seek on the view's own ordering
+        if not any(hasattr(backend, 'get_ordering') for backend in getattr(view, 'filter_backends', [])):
+            ordering = getattr(view, 'ordering', None) or self.ordering
+            return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+        return super().get_ordering(request, queryset, view)
+
+    def get_html_context(self):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_html_context()
+        return super().get_html_context()
@@ -0,0 +1,44 @@
+from django.db import transaction
+from apps.core.cache import bump_generation
+
+
+def bulk_reorder(queryset, items, not_found_error):
+    """
+    Apply [{id, order}, ...] to rows of `queryset`: every id is checked with
+    one query and the new orders are written with one bulk_update, all in a
+    transaction. Items that are malformed or not found are reported, not
+    applied; the rest are. Returns (updated count, errors).
+
+    bulk_update skips signals, so the cache generation is bumped here.
+    """
+    errors, orders = [], {}
+    for item in items:
+        item_id = item.get('id') if isinstance(item, dict) else None
+        new_order = item.get('order') if isinstance(item, dict) else None
+        if item_id is None or new_order is None:
+            errors.append({'error': 'Each item must have "id" and "order"', 'item': item})
+            continue
+        try:
+            pk, order = int(item_id), int(new_order)
+        except (TypeError, ValueError):
+            pk = order = -1
+        if pk < 0 or order < 0:
+            errors.append({'error': '"id" and "order" must be non-negative integers', 'item': item})
+            continue
+        orders.pop(pk, None)  # A repeated id takes its last order
+        orders[pk] = (order, item_id)
+
+    model = queryset.model
+    with transaction.atomic():
+        rows = queryset.only('order').in_bulk(list(orders))
+        errors.extend({'error': not_found_error, 'id': item_id} for pk, (_, item_id) in orders.items() if pk not in rows)
+
+        changed = []
+        for pk, row in rows.items():
+            if row.order != orders[pk][0]:
+                row.order = orders[pk][0]
+                changed.append(row)
+        if changed:
+            model.objects.bulk_update(changed, ['order'])
+            transaction.on_commit(lambda: bump_generation(model._meta.label))
+    return len(rows), errors
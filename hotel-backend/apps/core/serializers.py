@@ -1,5 +1,8 @@
+from django.conf import settings
 from rest_framework import serializers
-from apps.core.models import GalleryCategory, GalleryImage, ContactMessage
+from apps.core.models import GalleryCategory, GalleryImage, ContactMessage, UploadSession
+from apps.core.images import SrcsetField
+from apps.rooms.models import Room
 
 
 class GalleryCategorySerializer(serializers.ModelSerializer):
@@ -22,11 +25,12 @@ class GalleryImageSerializer(serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     image = serializers.ImageField(required=False, allow_null=True)
     image_url = serializers.URLField(required=False, allow_blank=True)
+    srcset = SrcsetField()
 
     class Meta:
         model = GalleryImage
         fields = [
-            'id', 'category', 'category_name', 'image', 'image_url', 'image_display',
+            'id', 'category', 'category_name', 'image', 'image_url', 'image_display', 'srcset',
             'alt_text', 'order', 'is_active', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
@@ -74,3 +78,41 @@ class ContactMessageSerializer(serializers.ModelSerializer):
         model = ContactMessage
         fields = ['id', 'name', 'email', 'phone', 'subject', 'message', 'is_read', 'created_at']
         read_only_fields = ['id', 'created_at']
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """Starts a resumable upload; alt_text, order and is_primary are applied to the image"""
+    alt_text = serializers.CharField(required=False, allow_blank=True, max_length=200, write_only=True)
+    order = serializers.IntegerField(required=False, min_value=0, write_only=True)
+    is_primary = serializers.BooleanField(required=False, write_only=True)
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'target', 'parent_id', 'filename', 'size', 'received', 'status', 'image_id',
+            'chunk_size', 'alt_text', 'order', 'is_primary', 'created_at'
+        ]
+        read_only_fields = ['received', 'status', 'image_id', 'created_at']
+
+    def get_chunk_size(self, obj):
+        """Largest chunk the server accepts per PUT"""
+        return settings.UPLOAD_CHUNK_MAX_SIZE
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f'size must be between 1 and {settings.UPLOAD_MAX_SIZE} bytes')
+        return value
+
+    def validate(self, data):
+        """The parent must exist; image attributes move into `attributes`"""
+        parent_model = Room if data['target'] == UploadSession.Target.ROOM_IMAGE else GalleryCategory
+        if not parent_model.objects.filter(pk=data['parent_id']).exists():
+            raise serializers.ValidationError({'parent_id': f'{parent_model._meta.verbose_name.title()} not found'})
+        if 'is_primary' in data and data['target'] != UploadSession.Target.ROOM_IMAGE:
+            raise serializers.ValidationError({'is_primary': 'Only room images have a primary flag'})
+
+        data['attributes'] = {
+            name: data.pop(name) for name in ('alt_text', 'order', 'is_primary') if name in data
+        }
+        return data
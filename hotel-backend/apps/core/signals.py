@@ -0,0 +1,76 @@
+from collections import Counter
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from apps.core.cache import CACHE_GENERATION_MODELS, bump_generation
+from apps.core.images import IMAGE_VARIANT_MODELS, needs_variants, schedule_variants
+from apps.core.models import MediaFile
+
+
+def bump_model_generation(sender, **kwargs):
+    """Invalidate cached responses once the write is committed"""
+    label = sender._meta.label
+    transaction.on_commit(lambda: bump_generation(label))
+
+
+def bump_m2m_generation(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        label = instance._meta.label
+        transaction.on_commit(lambda: bump_generation(label))
+
+
+for label in CACHE_GENERATION_MODELS:
+    model = apps.get_model(label)
+    post_save.connect(bump_model_generation, sender=model, dispatch_uid=f'cache-generation-save-{label}')
+    post_delete.connect(bump_model_generation, sender=model, dispatch_uid=f'cache-generation-delete-{label}')
+    for field in model._meta.local_many_to_many:
+        m2m_changed.connect(
+            bump_m2m_generation, sender=field.remote_field.through,
+            dispatch_uid=f'cache-generation-m2m-{label}-{field.name}'
+        )
+
+
+def generate_image_variants(sender, instance, raw=False, **kwargs):
+    """Render resized copies of a new or replaced upload, off the request path"""
+    if not raw and needs_variants(instance):
+        schedule_variants(instance)
+
+
+def remember_file_references(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Note the files the row referenced before this save, to diff them afterwards"""
+    # A new upload is saved to storage after this signal; keep its content to restore from
+    image = instance.image
+    instance._file_upload = image.file if image and not image._committed else None
+    if update_fields is not None and not {'image', 'variants'} & set(update_fields):
+        instance._file_references = None
+    elif instance.pk is None or raw:
+        instance._file_references = Counter()
+    else:
+        previous = sender.objects.filter(pk=instance.pk).only('image', 'variants').first()
+        instance._file_references = MediaFile.references_of(previous)
+
+
+def update_file_references(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_file_references', None)
+    if previous is None:
+        return
+    current = MediaFile.references_of(instance)
+    acquired = current - previous
+    upload = getattr(instance, '_file_upload', None)
+    sources = {instance.image.name: upload} if upload is not None and instance.image.name in acquired else None
+    MediaFile.acquire(acquired, instance.image.storage, sources)
+    MediaFile.release(previous - current, instance.image.storage)
+
+
+def release_file_references(sender, instance, **kwargs):
+    # Read the stored row: variants are written with update(), so instances may be stale
+    stored = sender.objects.filter(pk=instance.pk).only('image', 'variants').first()
+    MediaFile.release(MediaFile.references_of(stored), instance.image.storage)
+
+
+for label in IMAGE_VARIANT_MODELS:
+    model = apps.get_model(label)
+    pre_save.connect(remember_file_references, sender=model, dispatch_uid=f'file-references-pre-save-{label}')
+    post_save.connect(update_file_references, sender=model, dispatch_uid=f'file-references-save-{label}')
+    pre_delete.connect(release_file_references, sender=model, dispatch_uid=f'file-references-delete-{label}')
+    post_save.connect(generate_image_variants, sender=model, dispatch_uid=f'image-variants-save-{label}')
@@ -0,0 +1,52 @@
+import hashlib
+import posixpath
+import re
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+# Directory (under MEDIA_ROOT) holding content-addressed files
+CONTENT_DIR = 'content'
+CONTENT_NAME = re.compile(rf'^{CONTENT_DIR}/[0-9a-f]{{2}}/[0-9a-f]{{64}}(\.\w+)?$')
+
+# Content-addressed files never change, so clients and CDNs may keep them forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def content_name(digest, original_name):
+    """content/ab/ab12...ef.jpg: the sha256 of the bytes plus the original extension"""
+    extension = posixpath.splitext(original_name or '')[1].lower()
+    return f'{CONTENT_DIR}/{digest[:2]}/{digest}{extension}'
+
+
+def is_content_name(name):
+    return bool(name) and CONTENT_NAME.match(name) is not None
+
+
+def file_digest(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File system storage naming every file by the sha256 of its bytes.
+
+    The name passed to save() only contributes its extension. Saving bytes
+    that are already stored writes nothing and returns the existing name,
+    so the same photo uploaded to several rooms or gallery categories is one
+    file. Deletion is left to reference counting (MediaFile).
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        target = content_name(file_digest(content), name)
+        if self.exists(target):
+            return target
+        return super().save(target, content, max_length=max_length)
@@ -1,3 +1,645 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.core.models import ContactMessage, GalleryCategory, GalleryImage, MediaFile, UploadSession
+from apps.core.pagination import CursorOrPageNumberPagination
+from apps.core.views import serve_media
+from apps.rooms.models import Room, RoomImage
+from apps.users.models import CustomUser
 
-# Create your tests here.
+
+class ResponseCacheTests(TestCase):
+    """Anonymous catalog GETs are cached until a dependent model changes"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = GalleryCategory.objects.create(name='Pool')
+        self.image = GalleryImage.objects.create(category=self.category, image_url='https://example.com/pool.jpg')
+
+    def test_repeated_get_is_served_from_cache(self):
+        first = self.client.get('/api/gallery/?ordering=order')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/gallery/?ordering=order')
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second['Content-Type'], first['Content-Type'])
+        self.assertEqual(second.content, first.content)
+
+    def test_query_string_is_part_of_the_key(self):
+        self.client.get('/api/gallery/')
+        self.assertEqual(self.client.get('/api/gallery/?page=1')['X-Cache'], 'MISS')
+
+    def test_save_invalidates_dependent_endpoints(self):
+        self.client.get('/api/gallery/')
+        self.client.get('/api/gallery-categories/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Spa'
+            self.category.save()
+
+        gallery = self.client.get('/api/gallery/')
+        self.assertEqual(gallery['X-Cache'], 'MISS')
+        self.assertEqual(gallery.json()['results'][0]['category_name'], 'Spa')
+        self.assertEqual(self.client.get('/api/gallery-categories/')['X-Cache'], 'MISS')
+
+    def test_authenticated_requests_bypass_the_cache(self):
+        staff = CustomUser.objects.create_user(username='staff', password='x', role='STAFF')
+        self.client.get('/api/gallery-categories/')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(staff).access_token}')
+
+        response = self.client.get('/api/gallery-categories/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Cache', response)
+
+
+class ConditionalGetTests(TestCase):
+    """Catalog endpoints send validators and answer revalidation with 304"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = GalleryCategory.objects.create(name='Pool')
+        GalleryImage.objects.create(category=self.category, image_url='https://example.com/pool.jpg')
+
+    def test_matching_etag_gets_not_modified(self):
+        response = self.client.get('/api/gallery-categories/')
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+
+        # Served from the response cache: no queries at all
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/gallery-categories/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        # Uncached (authenticated) request: user lookup and one aggregate query, nothing serialized
+        staff = CustomUser.objects.create_user(username='staff', password='x', role='STAFF')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(staff).access_token}')
+        with self.assertNumQueries(2):
+            uncached = self.client.get('/api/gallery-categories/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(uncached.status_code, 304)
+        self.assertEqual(uncached['ETag'], response['ETag'])
+
+    def test_etag_changes_with_data_and_query(self):
+        etag = self.client.get('/api/gallery/')['ETag']
+        self.assertNotEqual(self.client.get('/api/gallery/?ordering=order')['ETag'], etag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GalleryImage.objects.create(category=self.category, image_url='https://example.com/spa.jpg')
+
+        response = self.client.get('/api/gallery/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_model_without_updated_at_uses_generations(self):
+        response = self.client.get('/api/amenities/')
+
+        self.assertIn('ETag', response)
+        self.assertEqual(
+            self.client.get('/api/amenities/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304
+        )
+
+
+class ContactMessagePaginationTests(TestCase):
+    """The contact inbox pages by cursor, newest first, or by number on request"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(username='staff', password='x', role='STAFF'))
+        for index in range(3):
+            ContactMessage.objects.create(name=f'Sender {index}', email='sender@example.com', subject='Hi', message='Hello')
+
+    def test_pages_follow_the_cursor(self):
+        with mock.patch.object(CursorOrPageNumberPagination, 'page_size', 2):
+            with CaptureQueriesContext(connection) as queries:
+                first = self.client.get('/api/contact/').json()
+            second = self.client.get(first['next']).json()
+
+        self.assertNotIn('count', first)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNone(second['next'])
+        ids = [message['id'] for message in first['results'] + second['results']]
+        self.assertEqual(ids, list(ContactMessage.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+    def test_page_number_opt_in(self):
+        data = self.client.get('/api/contact/?page=1').json()
+
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(len(data['results']), 3)
+
+    def test_list_is_staff_only(self):
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.get('/api/contact/').status_code, (401, 403))
+
+
+class FastGallerySerializerTests(TestCase):
+
+    def test_fast_serializer_renders_identical_json(self):
+        category = GalleryCategory.objects.create(name='Pool')
+        GalleryImage.objects.create(category=category, image_url='https://example.com/pool.jpg', order=2)
+        GalleryImage.objects.create(
+            category=category, image='gallery_images/pool deck.jpg', alt_text='Deck',
+            variants={
+                'source': 'gallery_images/pool deck.jpg', 'width': 900,
+                'webp': {'320': 'gallery_images/variants/pool deck_320w.webp'},
+                'jpeg': {'320': 'gallery_images/variants/pool deck_320w.jpg'},
+            }
+        )
+        client = APIClient()
+
+        cache.clear()
+        regular = client.get('/api/gallery/')
+        cache.clear()
+        with override_settings(FAST_LIST_SERIALIZERS=True):
+            fast = client.get('/api/gallery/')
+
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.content, regular.content)
+
+
+def upload(name, width=150, height=100):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), 'teal').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0, IMAGE_VARIANT_WIDTHS=[100, 200])
+class ImageVariantTests(TestCase):
+    """Uploads get resized WebP/JPEG variants, exposed as srcset maps"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.category = GalleryCategory.objects.create(name='Pool')
+
+    def test_upload_generates_variants_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = GalleryImage.objects.create(category=self.category, image=upload('pool.jpg'))
+
+        image.refresh_from_db()
+        # 150px source: never upscaled past its own width
+        self.assertEqual(image.variants['width'], 150)
+        self.assertEqual(list(image.variants['webp']), ['100', '150'])
+        self.assertEqual(list(image.variants['jpeg']), ['100', '150'])
+        with default_storage.open(image.variants['webp']['100']) as file, Image.open(file) as variant:
+            self.assertEqual((variant.format, variant.size), ('WEBP', (100, 67)))
+
+        srcset = APIClient().get('/api/gallery/').json()['results'][0]['srcset']
+        self.assertEqual(set(srcset), {'webp', 'jpeg'})
+        self.assertRegex(srcset['webp'], r'^http://testserver/media/content/\w\w/\w{64}\.webp 100w, .+ 150w$')
+
+    def test_url_only_images_have_no_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            GalleryImage.objects.create(category=self.category, image_url='https://example.com/pool.jpg')
+
+        self.assertEqual(APIClient().get('/api/gallery/').json()['results'][0]['srcset'], {})
+
+    def test_delete_removes_variant_files(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = GalleryImage.objects.create(category=self.category, image=upload('pool.jpg'))
+        image.refresh_from_db()
+        variant = image.variants['jpeg']['150']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+
+        self.assertFalse(default_storage.exists(variant))
+
+    def test_backfill_command_renders_in_worker_processes(self):
+        room = Room.objects.create(name='Backfill Room', description='x', base_price_per_night=Decimal('100.00'))
+        RoomImage.objects.create(room=room, image=upload('room.jpg', width=300))  # no commit: nothing generated
+        self.assertEqual(RoomImage.objects.get().variants, {})
+
+        out = StringIO()
+        call_command('generate_image_variants', '--workers', '2', stdout=out)
+
+        self.assertIn('rooms.RoomImage: generated variants for 1 of 1 images', out.getvalue())
+        self.assertEqual(list(RoomImage.objects.get().variants['webp']), ['100', '200'])
+        out = StringIO()
+        call_command('generate_image_variants', '--workers', '1', stdout=out)
+        self.assertIn('rooms.RoomImage: generated variants for 0 of 0 images', out.getvalue())
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0, IMAGE_VARIANT_WIDTHS=[100])
+class BulkImageUploadTests(TestCase):
+    """Bulk uploads validate in parallel and insert every row at once"""
+
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.addCleanup(shutil.rmtree, self.media_root)
+        staff = CustomUser.objects.create_user(username='staff', password='x', role='STAFF')
+        self.client = APIClient()
+        self.client.force_authenticate(staff)
+        self.room = Room.objects.create(name='Upload Room', description='x', base_price_per_night=Decimal('100.00'))
+
+    def post_room_images(self, count, **extra):
+        files = [upload(f'photo_{index}.jpg') for index in range(count)]
+        return self.client.post(
+            f'/api/rooms/{self.room.slug}/bulk_add_images/', {'images': files, **extra}, format='multipart'
+        )
+
+    def test_room_batch_settles_primary_once(self):
+        bad = SimpleUploadedFile('notes.jpg', b'not an image', content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/rooms/{self.room.slug}/bulk_add_images/',
+                {'images': [upload('a.jpg'), bad, upload('b.jpg')], 'image_urls': ['https://example.com/c.jpg']},
+                format='multipart'
+            )
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual((data['total_uploaded'], data['total_errors']), (3, 1))
+        self.assertEqual(data['errors'][0]['file'], 'notes.jpg')
+        self.assertIn('image', data['errors'][0]['errors'])
+        self.assertEqual([image['order'] for image in data['success']], [1, 3, 4])
+        self.assertEqual([image['is_primary'] for image in data['success']], [True, False, False])
+        self.assertRegex(data['success'][0]['image'], r'^http://testserver/media/content/\w\w/\w{64}\.jpg$')
+        # Signals are skipped by bulk_create; variants are still scheduled
+        self.assertTrue(all(image.variants for image in RoomImage.objects.exclude(image='')))
+
+    def test_existing_primary_is_kept(self):
+        primary = RoomImage.objects.create(room=self.room, image_url='https://example.com/p.jpg', order=5)
+
+        data = self.post_room_images(2).json()
+
+        self.assertEqual([image['order'] for image in data['success']], [6, 7])
+        self.assertEqual(list(RoomImage.objects.filter(is_primary=True)), [primary])
+
+    def test_insert_is_one_query_whatever_the_batch_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self.post_room_images(2)
+        with CaptureQueriesContext(connection) as large:
+            self.post_room_images(8)
+
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(sum('INSERT INTO "room_images"' in query['sql'] for query in large), 1)
+
+    def test_gallery_bulk_upload(self):
+        category = GalleryCategory.objects.create(name='Spa')
+
+        response = self.client.post(
+            '/api/gallery/bulk_upload/',
+            {'category_id': category.id, 'images': [upload('spa.jpg'), upload('sauna.jpg')]},
+            format='multipart'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([image['order'] for image in response.json()['success']], [1, 2])
+        self.assertEqual(category.images.count(), 2)
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0, IMAGE_VARIANT_WIDTHS=[100])
+class ContentAddressedStorageTests(TestCase):
+    """Identical uploads share one file, kept until its last reference goes"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.category = GalleryCategory.objects.create(name='Pool')
+        self.room = Room.objects.create(name='Shared Room', description='x', base_price_per_night=Decimal('100.00'))
+
+    def test_same_photo_is_stored_once_and_refcounted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            room_image = RoomImage.objects.create(room=self.room, image=upload('room.jpg'))
+            gallery_image = GalleryImage.objects.create(category=self.category, image=upload('copy.JPG'))
+
+        name = room_image.image.name
+        self.assertEqual(gallery_image.image.name, name)
+        self.assertEqual(MediaFile.objects.get(name=name).references, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            room_image.delete()
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(MediaFile.objects.get(name=name).references, 1)
+
+        gallery_image.refresh_from_db()
+        variants = [stored for key in ('webp', 'jpeg') for stored in gallery_image.variants[key].values()]
+        with self.captureOnCommitCallbacks(execute=True):
+            gallery_image.delete()
+        self.assertFalse(any(default_storage.exists(stored) for stored in [name, *variants]))
+        self.assertFalse(MediaFile.objects.exists())
+
+    def test_replacing_the_file_releases_the_old_one(self):
+        image = GalleryImage.objects.create(category=self.category, image=upload('a.jpg'))
+        old = image.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            image.image = upload('b.jpg', width=120)
+            image.save()
+
+        self.assertNotEqual(image.image.name, old)
+        self.assertFalse(default_storage.exists(old))
+        self.assertEqual(list(MediaFile.objects.filter(name__in=[old, image.image.name]).values_list('name', flat=True)),
+                         [image.image.name])
+
+    def test_release_spares_a_file_acquired_before_it_commits(self):
+        first = RoomImage.objects.create(room=self.room, image=upload('room.jpg'))
+        name = first.image.name
+        with self.captureOnCommitCallbacks() as deletes:
+            first.delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            GalleryImage.objects.create(category=self.category, image=upload('copy.jpg'))
+        for callback in deletes:
+            callback()
+
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(MediaFile.objects.get(name=name).references, 1)
+
+    def test_file_deleted_while_it_is_reused_is_restored(self):
+        first = RoomImage.objects.create(room=self.room, image=upload('room.jpg'))
+        name = first.image.name
+        with self.captureOnCommitCallbacks() as deletes:
+            first.delete()
+        acquire = MediaFile.acquire
+
+        def acquire_after_deletes(*args):
+            # The delete commits after the copy was saved under the existing name
+            for callback in deletes:
+                callback()
+            acquire(*args)
+
+        with mock.patch.object(MediaFile, 'acquire', acquire_after_deletes):
+            with self.captureOnCommitCallbacks(execute=True):
+                copy = GalleryImage.objects.create(category=self.category, image=upload('copy.jpg'))
+
+        self.assertEqual(copy.image.name, name)
+        self.assertTrue(default_storage.exists(name))
+        with default_storage.open(name) as file:
+            self.assertEqual(file.read(), upload('room.jpg').read())
+
+    def test_content_urls_are_immutable(self):
+        image = GalleryImage.objects.create(category=self.category, image=upload('a.jpg'))
+
+        response = serve_media(RequestFactory().get('/'), image.image.name, document_root=self.media_root)
+
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_dedupe_command_folds_legacy_duplicates(self):
+        photo = upload('legacy.jpg').read()
+        for name in ('room_images/legacy.jpg', 'gallery_images/legacy copy.jpg'):
+            path = f'{self.media_root}/{name}'
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(photo)
+        RoomImage.objects.create(room=self.room, image='room_images/legacy.jpg')
+        GalleryImage.objects.create(category=self.category, image='gallery_images/legacy copy.jpg')
+
+        out = StringIO()
+        call_command('dedupe_media', stdout=out)
+
+        self.assertIn('2 files, 1 distinct contents', out.getvalue())
+        name = RoomImage.objects.get().image.name
+        self.assertEqual(GalleryImage.objects.get().image.name, name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertFalse(default_storage.exists('room_images/legacy.jpg'))
+        self.assertEqual(list(MediaFile.objects.values_list('name', 'references')), [(name, 2)])
+
+
+@override_settings(IMAGE_VARIANT_WORKERS=0, IMAGE_VARIANT_WIDTHS=[100], UPLOAD_CHUNK_MAX_SIZE=1024)
+class ResumableUploadTests(TestCase):
+    """Chunked uploads stream to a part file and become room or gallery images"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root, UPLOAD_SESSION_DIR=f'{self.media_root}/parts'))
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(username='staff', password='x', role='STAFF'))
+        self.room = Room.objects.create(name='Chunk Room', description='x', base_price_per_night=Decimal('100.00'))
+        buffer = io.BytesIO()
+        Image.effect_noise((400, 300), 64).convert('RGB').save(buffer, 'JPEG')
+        self.photo = buffer.getvalue()
+
+    def start(self, **extra):
+        data = {'target': 'ROOM_IMAGE', 'parent_id': self.room.id, 'filename': 'big.jpg', 'size': len(self.photo)}
+        return self.client.post('/api/uploads/', {**data, **extra}, format='json')
+
+    def put(self, session_id, start, end):
+        return self.client.put(
+            f'/api/uploads/{session_id}/', self.photo[start:end + 1], content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.photo)}'
+        )
+
+    def send_all(self, session_id, start=0):
+        for offset in range(start, len(self.photo), 1024):
+            response = self.put(session_id, offset, min(offset + 1023, len(self.photo) - 1))
+            self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_chunks_resume_and_complete_into_a_room_image(self):
+        session = self.start(alt_text='Big', is_primary=True).json()
+        self.assertEqual((session['received'], session['chunk_size']), (0, 1024))
+
+        self.assertEqual(self.put(session['id'], 0, 1023).json()['received'], 1024)
+        # A retried or skipped chunk is refused with the offset to resume from
+        conflict = self.put(session['id'], 2048, 3071)
+        self.assertEqual((conflict.status_code, conflict.json()['received']), (409, 1024))
+        self.assertEqual(self.client.get(f"/api/uploads/{session['id']}/").json()['received'], 1024)
+        self.send_all(session['id'], start=1024)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/api/uploads/{session['id']}/complete/",
+                {'sha256': hashlib.sha256(self.photo).hexdigest()}, format='json'
+            )
+
+        self.assertEqual(response.status_code, 201)
+        image = RoomImage.objects.get()
+        self.assertEqual((image.alt_text, image.is_primary, image.room_id), ('Big', True, self.room.id))
+        with default_storage.open(image.image.name) as file:
+            self.assertEqual(file.read(), self.photo)
+        self.assertTrue(image.variants)
+        self.assertFalse(os.listdir(f'{self.media_root}/parts'))
+        # Completing again (e.g. after a dropped response) returns the same image
+        again = self.client.post(f"/api/uploads/{session['id']}/complete/")
+        self.assertEqual((again.status_code, again.json()['id']), (200, image.id))
+
+    def test_gallery_target(self):
+        category = GalleryCategory.objects.create(name='Lobby')
+        session = self.start(target='GALLERY_IMAGE', parent_id=category.id).json()
+        self.send_all(session['id'])
+
+        response = self.client.post(f"/api/uploads/{session['id']}/complete/")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(category.images.get().id, response.json()['id'])
+
+    def test_incomplete_or_invalid_uploads_are_refused(self):
+        session = self.start().json()
+        self.put(session['id'], 0, 1023)
+        self.assertEqual(self.client.post(f"/api/uploads/{session['id']}/complete/").status_code, 400)
+
+        self.photo = b'x' * len(self.photo)
+        session = self.start().json()
+        self.send_all(session['id'])
+        response = self.client.post(f"/api/uploads/{session['id']}/complete/")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.json())
+        self.assertFalse(RoomImage.objects.exists())
+
+    def test_completion_is_claimed_once(self):
+        session = self.start().json()
+        self.send_all(session['id'])
+        # Another request is completing this upload
+        UploadSession.objects.filter(pk=session['id']).update(status=UploadSession.Status.COMPLETING)
+
+        response = self.client.post(f"/api/uploads/{session['id']}/complete/")
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(RoomImage.objects.exists())
+        self.assertFalse(MediaFile.objects.exists())
+
+    def test_failed_completion_can_be_retried(self):
+        session = self.start().json()
+        self.send_all(session['id'])
+
+        mismatch = self.client.post(f"/api/uploads/{session['id']}/complete/", {'sha256': '0' * 64}, format='json')
+        self.assertEqual(mismatch.status_code, 400)
+        self.assertEqual(UploadSession.objects.get().status, UploadSession.Status.PENDING)
+        self.assertEqual(self.client.post(f"/api/uploads/{session['id']}/complete/").status_code, 201)
+
+    def test_one_chunk_is_written_at_a_time(self):
+        session = self.start().json()
+        # Another request has claimed offset 0 and is writing its chunk
+        UploadSession.objects.filter(pk=session['id']).update(status=UploadSession.Status.WRITING)
+
+        response = self.put(session['id'], 0, 1023)
+
+        self.assertEqual((response.status_code, response.json()['received']), (409, 0))
+        self.assertEqual(os.path.getsize(f"{self.media_root}/parts/{session['id']}.part"), 0)
+
+    def test_offset_is_claimed_while_the_chunk_is_written(self):
+        session = self.start().json()
+        statuses = []
+        write_chunk = UploadSession.write_chunk
+
+        def recording_write_chunk(upload, *args):
+            statuses.append(UploadSession.objects.get(pk=upload.pk).status)
+            return write_chunk(upload, *args)
+
+        with mock.patch.object(UploadSession, 'write_chunk', recording_write_chunk):
+            response = self.put(session['id'], 0, 1023)
+
+        self.assertEqual(statuses, [UploadSession.Status.WRITING])
+        self.assertEqual((response.json()['received'], response.json()['status']), (1024, 'PENDING'))
+        self.assertEqual(UploadSession.objects.get().status, UploadSession.Status.PENDING)
+
+    def test_purged_part_file_is_gone(self):
+        session = self.start().json()
+        os.remove(f"{self.media_root}/parts/{session['id']}.part")
+
+        self.assertEqual(self.put(session['id'], 0, 1023).status_code, 410)
+        session = UploadSession.objects.get()
+        self.assertEqual((session.status, session.received), (UploadSession.Status.PENDING, 0))
+
+    def test_start_validation_and_limits(self):
+        self.assertEqual(self.start(parent_id=999999).status_code, 400)
+        self.assertEqual(self.start(size=0).status_code, 400)
+
+        session = self.start().json()
+        self.assertEqual(self.put(session['id'], 0, 2047).status_code, 413)
+        missing_range = self.client.put(f"/api/uploads/{session['id']}/", b'abc', content_type='application/octet-stream')
+        self.assertEqual(missing_range.status_code, 400)
+
+    def test_abort_and_purge_remove_part_files(self):
+        first, second = self.start().json(), self.start().json()
+        self.put(first['id'], 0, 1023)
+
+        self.assertEqual(self.client.delete(f"/api/uploads/{first['id']}/").status_code, 204)
+        UploadSession.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        call_command('purge_upload_sessions', stdout=StringIO())
+
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.listdir(f'{self.media_root}/parts'))
+
+
+class BulkReorderTests(TestCase):
+    """Reorder endpoints validate in one query and write in one statement"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(username='staff', password='x', role='STAFF'))
+        self.category = GalleryCategory.objects.create(name='Pool')
+        self.images = [
+            GalleryImage.objects.create(category=self.category, image_url=f'https://example.com/{index}.jpg', order=index)
+            for index in range(30)
+        ]
+
+    def test_gallery_images_in_constant_queries(self):
+        items = [{'id': image.id, 'order': 100 - index} for index, image in enumerate(self.images)]
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.patch('/api/gallery/reorder/', {'images': items}, format='json')
+
+        self.assertEqual(response.json(), {'updated': 30, 'errors': []})
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries), 1)
+        self.assertLess(len(queries), 10)
+        self.assertEqual(len(callbacks), 1)  # cache generation bump
+        self.assertEqual(
+            list(GalleryImage.objects.order_by('order').values_list('id', flat=True)),
+            [image.id for image in reversed(self.images)]
+        )
+
+    def test_bad_items_are_reported_and_the_rest_applied(self):
+        response = self.client.patch('/api/gallery/reorder/', {'images': [
+            {'id': self.images[0].id, 'order': 7},
+            {'id': 999999, 'order': 1},
+            {'id': self.images[1].id},
+            {'id': self.images[2].id, 'order': 'first'},
+        ]}, format='json')
+
+        data = response.json()
+        self.assertEqual(data['updated'], 1)
+        self.assertEqual(sorted(error['error'] for error in data['errors']), [
+            '"id" and "order" must be non-negative integers',
+            'Each item must have "id" and "order"',
+            'Image not found',
+        ])
+        self.assertEqual(GalleryImage.objects.get(id=self.images[0].id).order, 7)
+
+    def test_categories_and_room_images(self):
+        other = GalleryCategory.objects.create(name='Spa', order=5)
+        response = self.client.patch('/api/gallery-categories/reorder/', {'categories': [
+            {'id': self.category.id, 'order': 9}, {'id': other.id, 'order': 1},
+        ]}, format='json')
+        self.assertEqual(response.json(), {'updated': 2, 'errors': []})
+        self.assertEqual(list(GalleryCategory.objects.values_list('name', flat=True)), ['Spa', 'Pool'])
+
+        room = Room.objects.create(name='Reorder Room', description='x', base_price_per_night=Decimal('100.00'))
+        first = RoomImage.objects.create(room=room, image_url='https://example.com/a.jpg', order=0)
+        # Another room's image is not this room's to reorder
+        foreign = Room.objects.create(name='Other Room', description='x', base_price_per_night=Decimal('100.00'))
+        stranger = RoomImage.objects.create(room=foreign, image_url='https://example.com/b.jpg', order=0)
+        response = self.client.patch(f'/api/rooms/{room.slug}/reorder_images/', {'images': [
+            {'id': first.id, 'order': 3}, {'id': stranger.id, 'order': 3},
+        ]}, format='json')
+
+        self.assertEqual(response.json(), {'updated': 1, 'errors': [{'error': 'Image not found', 'id': stranger.id}]})
+        self.assertEqual((RoomImage.objects.get(id=first.id).order, RoomImage.objects.get(id=stranger.id).order), (3, 0))
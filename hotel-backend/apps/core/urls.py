@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from apps.core.views import GalleryCategoryViewSet, GalleryImageViewSet, ContactMessageViewSet
+from apps.core.views import GalleryCategoryViewSet, GalleryImageViewSet, ContactMessageViewSet, UploadSessionViewSet
 
 router = DefaultRouter()
 router.register(r'gallery-categories', GalleryCategoryViewSet)
 router.register(r'gallery', GalleryImageViewSet)
 router.register(r'contact', ContactMessageViewSet)
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,17 +1,29 @@
-from rest_framework import viewsets, status
+import re
+from rest_framework import mixins, viewsets, status
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db import models
-from apps.core.models import GalleryCategory, GalleryImage, ContactMessage
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from django.views.static import serve
+from apps.core.models import GalleryCategory, GalleryImage, ContactMessage, UploadSession
 from apps.core.serializers import (
     GalleryCategorySerializer, GalleryImageSerializer,
-    GalleryImageCreateSerializer, ContactMessageSerializer
+    GalleryImageCreateSerializer, ContactMessageSerializer, UploadSessionSerializer
 )
+from apps.rooms.serializers import RoomImageCreateSerializer
 from apps.rooms.views import IsAdminOrStaff
+from apps.core.pagination import CursorOrPageNumberPagination
+from apps.core.reorder import bulk_reorder
+from apps.core.bulk_images import BulkImageUpload
+from apps.core.cache import CachedResponseMixin, ConditionalGetMixin
+from apps.core.storage import IMMUTABLE_CACHE_CONTROL, file_digest, is_content_name
+from apps.core.fast_serializers import FastListMixin, GalleryImageFastSerializer
 
 
-class GalleryCategoryViewSet(viewsets.ModelViewSet):
+class GalleryCategoryViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     Public endpoints:
     - GET /api/gallery-categories/ - List all categories
@@ -24,6 +36,7 @@ class GalleryCategoryViewSet(viewsets.ModelViewSet):
     """
     queryset = GalleryCategory.objects.all()
     serializer_class = GalleryCategorySerializer
+    cache_dependencies = ('core.GalleryCategory', 'core.GalleryImage')
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -51,24 +64,7 @@ class GalleryCategoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        updated_count = 0
-        errors = []
-
-        for item in category_orders:
-            category_id = item.get('id')
-            new_order = item.get('order')
-
-            if category_id is None or new_order is None:
-                errors.append({'error': 'Each item must have "id" and "order"', 'item': item})
-                continue
-
-            try:
-                category = GalleryCategory.objects.get(id=category_id)
-                category.order = new_order
-                category.save(update_fields=['order'])
-                updated_count += 1
-            except GalleryCategory.DoesNotExist:
-                errors.append({'error': 'Category not found', 'id': category_id})
+        updated_count, errors = bulk_reorder(GalleryCategory.objects.all(), category_orders, 'Category not found')
 
         return Response({
             'updated': updated_count,
@@ -76,7 +72,7 @@ class GalleryCategoryViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK if updated_count > 0 else status.HTTP_400_BAD_REQUEST)
 
 
-class GalleryImageViewSet(viewsets.ModelViewSet):
+class GalleryImageViewSet(CachedResponseMixin, ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
     """
     Public endpoints:
     - GET /api/gallery/ - List gallery images
@@ -88,6 +84,8 @@ class GalleryImageViewSet(viewsets.ModelViewSet):
     """
     queryset = GalleryImage.objects.all()
     serializer_class = GalleryImageSerializer
+    fast_serializer_class = GalleryImageFastSerializer
+    cache_dependencies = ('core.GalleryImage', 'core.GalleryCategory')
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -128,45 +126,10 @@ class GalleryImageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        images_data = []
-        errors = []
-
-        # Handle multiple file uploads
-        files = request.FILES.getlist('images')
-        urls = request.data.getlist('image_urls')
-
-        # Get starting order value (next highest order)
-        max_order = category.images.aggregate(models.Max('order'))['order__max'] or 0
-        current_order = max_order + 1
-
-        # Process file uploads
-        for idx, file in enumerate(files):
-            data = {
-                'category': category.id,
-                'image': file,
-                'order': current_order + idx
-            }
-            serializer = GalleryImageCreateSerializer(data=data, context={'request': request})
-            if serializer.is_valid():
-                serializer.save()
-                images_data.append(serializer.data)
-            else:
-                errors.append({'file': file.name, 'errors': serializer.errors})
-
-        # Process URL uploads
-        for idx, url in enumerate(urls):
-            if url:  # Skip empty URLs
-                data = {
-                    'category': category.id,
-                    'image_url': url,
-                    'order': current_order + len(files) + idx
-                }
-                serializer = GalleryImageCreateSerializer(data=data, context={'request': request})
-                if serializer.is_valid():
-                    serializer.save()
-                    images_data.append(serializer.data)
-                else:
-                    errors.append({'url': url, 'errors': serializer.errors})
+        created, errors = BulkImageUpload(
+            GalleryImage, GalleryImageCreateSerializer, parent_field='category'
+        ).save(category, request.FILES.getlist('images'), request.data.getlist('image_urls'))
+        images_data = GalleryImageCreateSerializer(created, many=True, context={'request': request}).data
 
         return Response({
             'success': images_data,
@@ -186,24 +149,7 @@ class GalleryImageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        updated_count = 0
-        errors = []
-
-        for item in image_orders:
-            image_id = item.get('id')
-            new_order = item.get('order')
-
-            if image_id is None or new_order is None:
-                errors.append({'error': 'Each item must have "id" and "order"', 'item': item})
-                continue
-
-            try:
-                image = GalleryImage.objects.get(id=image_id)
-                image.order = new_order
-                image.save(update_fields=['order'])
-                updated_count += 1
-            except GalleryImage.DoesNotExist:
-                errors.append({'error': 'Image not found', 'id': image_id})
+        updated_count, errors = bulk_reorder(GalleryImage.objects.all(), image_orders, 'Image not found')
 
         return Response({
             'updated': updated_count,
@@ -221,9 +167,13 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
     - GET /api/contact/{id}/ - Get specific contact message
     - PATCH /api/contact/{id}/ - Mark message as read
     - DELETE /api/contact/{id}/ - Delete contact message
+
+    Lists use cursor pagination (follow `next`); send ?page=N for page numbers.
     """
     queryset = ContactMessage.objects.all()
     serializer_class = ContactMessageSerializer
+    pagination_class = CursorOrPageNumberPagination
+    ordering = ('-created_at', '-id')
 
     def get_permissions(self):
         if self.action == 'create':
@@ -247,3 +197,186 @@ class ContactMessageViewSet(viewsets.ModelViewSet):
         message.is_read = True
         message.save()
         return Response({'status': 'Message marked as read'})
+
+
+class SessionFile(File):
+    """
+    An assembled upload. The path lets Pillow validate it and the storage
+    move it into place without reading it into memory.
+    """
+
+    def __init__(self, path, name):
+        super().__init__(open(path, 'rb'), name=name)
+        self.path = path
+
+    def temporary_file_path(self):
+        return str(self.path)
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable chunked image uploads (admin/staff):
+    - POST /api/uploads/ - Start: target (ROOM_IMAGE|GALLERY_IMAGE), parent_id, filename, size
+      and optionally alt_text, order, is_primary
+    - PUT /api/uploads/{id}/ - Raw bytes with `Content-Range: bytes start-end/size`;
+      start must equal `received` (otherwise 409 with the offset to resume from), and
+      one chunk is written at a time (409 while another is being written);
+      410 once the part file has been purged
+    - GET /api/uploads/{id}/ - Progress; resume from `received`
+    - POST /api/uploads/{id}/complete/ - Validate and attach the image (optional sha256 check);
+      409 while another completion of the same upload is running
+    - DELETE /api/uploads/{id}/ - Abort
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAdminOrStaff]
+
+    CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+    # Image serializer and its parent field, per target
+    TARGETS = {
+        UploadSession.Target.ROOM_IMAGE: (RoomImageCreateSerializer, 'room'),
+        UploadSession.Target.GALLERY_IMAGE: (GalleryImageCreateSerializer, 'category'),
+    }
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(created_by=self.request.user)
+
+    def perform_create(self, serializer):
+        session = serializer.save(created_by=self.request.user)
+        session.create_file()
+
+    def perform_destroy(self, instance):
+        instance.delete_file()
+        instance.delete()
+
+    def update(self, request, pk=None):
+        """Write one chunk straight from the request stream to the part file"""
+        session = self.get_object()
+        if session.status in (UploadSession.Status.COMPLETING, UploadSession.Status.COMPLETE):
+            return Response({'error': 'Upload is already being completed'}, status=status.HTTP_409_CONFLICT)
+
+        match = self.CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+        if not match:
+            return Response(
+                {'error': 'Content-Range: bytes start-end/size header is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        start, end, total = map(int, match.groups())
+        if total != session.size or not start <= end < total:
+            return Response(
+                {'error': f'Range must lie within the {session.size} byte upload'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        length = end - start + 1
+        if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+            return Response(
+                {'error': f'Chunks are limited to {settings.UPLOAD_CHUNK_MAX_SIZE} bytes'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+        if start != session.received:
+            return Response(
+                {'error': 'Chunk must start at the received offset', 'received': session.received},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        # Claim the offset before touching the part file, so concurrent PUTs of the same
+        # chunk cannot interleave their writes (and completion waits for this one)
+        if not UploadSession.objects.filter(pk=session.pk, status=UploadSession.Status.PENDING, received=start).update(
+            status=UploadSession.Status.WRITING, updated_at=timezone.now()
+        ):
+            session.refresh_from_db()
+            return Response(
+                {'error': 'Another chunk is being written', 'received': session.received},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        written = 0
+        try:
+            written = session.write_chunk(request.stream, start, length) if request.stream else 0
+        except FileNotFoundError:
+            return self.expired()
+        finally:
+            # Release the claim, advancing past whatever prefix made it to disk
+            UploadSession.objects.filter(pk=session.pk, status=UploadSession.Status.WRITING).update(
+                status=UploadSession.Status.PENDING, received=start + written, updated_at=timezone.now()
+            )
+        session.status, session.received = UploadSession.Status.PENDING, start + written
+        return Response(self.get_serializer(session).data)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """Create the RoomImage / GalleryImage from the assembled file"""
+        session = self.get_object()
+        serializer_class, parent_field = self.TARGETS[session.target]
+        context = self.get_serializer_context()
+
+        if session.status == UploadSession.Status.COMPLETE:
+            image = serializer_class.Meta.model.objects.filter(pk=session.image_id).first()
+            if image is None:
+                return Response({'error': 'Image no longer exists'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(serializer_class(image, context=context).data)
+
+        if session.received != session.size:
+            return Response(
+                {'error': 'Upload is incomplete', 'received': session.received, 'size': session.size},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Claim the session, so concurrent completions cannot attach the file twice
+        if not UploadSession.objects.filter(pk=session.pk, status=UploadSession.Status.PENDING).update(
+            status=UploadSession.Status.COMPLETING, updated_at=timezone.now()
+        ):
+            return Response({'error': 'Upload is already being completed'}, status=status.HTTP_409_CONFLICT)
+        session.status = UploadSession.Status.COMPLETING
+
+        try:
+            response = self.attach(session, request.data.get('sha256'), serializer_class, parent_field, context)
+        finally:
+            if session.status != UploadSession.Status.COMPLETE:
+                # Failed: release the claim so the client can retry
+                UploadSession.objects.filter(pk=session.pk, status=UploadSession.Status.COMPLETING).update(
+                    status=UploadSession.Status.PENDING
+                )
+        return response
+
+    def attach(self, session, expected, serializer_class, parent_field, context):
+        try:
+            file = SessionFile(session.path, session.filename)
+        except FileNotFoundError:
+            return self.expired()
+        try:
+            if expected and file_digest(file) != expected.lower():
+                return Response({'error': 'sha256 does not match the uploaded bytes'}, status=status.HTTP_400_BAD_REQUEST)
+
+            serializer = serializer_class(
+                data={**session.attributes, parent_field: session.parent_id, 'image': file}, context=context
+            )
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                image = serializer.save()
+                UploadSession.objects.filter(pk=session.pk).update(
+                    status=UploadSession.Status.COMPLETE, image_id=image.pk, updated_at=timezone.now()
+                )
+            session.status, session.image_id = UploadSession.Status.COMPLETE, image.pk
+        finally:
+            file.close()
+
+        session.delete_file()  # Already gone when storage moved it into place
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def expired():
+        return Response(
+            {'error': 'The uploaded data has expired; start a new upload'},
+            status=status.HTTP_410_GONE
+        )
+
+
+def serve_media(request, path, document_root=None):
+    """Development media server; content-addressed files are marked immutable"""
+    response = serve(request, path, document_root=document_root)
+    if response.status_code == 200 and is_content_name(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
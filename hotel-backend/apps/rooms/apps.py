@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class RoomsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.rooms'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from apps.rooms import signals  # noqa: F401
+        from apps.rooms.search import ensure_search_index
+
+        post_migrate.connect(ensure_search_index, sender=self)
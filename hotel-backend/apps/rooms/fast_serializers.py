@@ -0,0 +1,99 @@
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from apps.core.fast_serializers import FastListSerializer, MediaUrls, choice_labels, decimal_formatter
+from apps.core.image_variants import image_srcset
+from apps.rooms.models import Amenity, Room, RoomImage
+from apps.rooms.serializers import RoomListSerializer
+
+
+class RoomListFastSerializer(FastListSerializer):
+    """
+    Mirrors RoomListSerializer from three queries: the room rows (heavy text
+    fields such as description are never selected), the first IMAGE_LIMIT
+    images per room and the amenities of the page.
+    """
+    fields = (
+        'id', 'name', 'slug', 'room_type', 'capacity', 'max_occupancy',
+        'bed_configuration', 'number_of_beds', 'size_sqm', 'view_type',
+        'has_balcony', 'base_price_per_night', 'wheelchair_accessible',
+    )
+
+    bed_configuration_labels = choice_labels(Room, 'bed_configuration')
+    view_type_labels = choice_labels(Room, 'view_type')
+    format_size = staticmethod(decimal_formatter(Room, 'size_sqm'))
+    format_price = staticmethod(decimal_formatter(Room, 'base_price_per_night'))
+
+    def images_by_room(self, room_ids, media):
+        """First IMAGE_LIMIT images of each room, in RoomImage's ordering"""
+        ordering = [F(field[1:]).desc() if field.startswith('-') else F(field).asc()
+                    for field in RoomImage._meta.ordering]
+        images = RoomImage.objects.filter(room_id__in=room_ids).annotate(
+            position=Window(RowNumber(), partition_by=F('room_id'), order_by=ordering)
+        ).filter(position__lte=RoomListSerializer.IMAGE_LIMIT).values(
+            'id', 'room_id', 'image', 'image_url', 'variants', 'alt_text', 'is_primary', 'order'
+        )
+
+        by_room = {}
+        for image in images:
+            url = media.url(image['image'])
+            by_room.setdefault(image['room_id'], []).append({
+                'id': image['id'],
+                'image': url,
+                'image_url': image['image_url'],
+                'image_display': url or image['image_url'],
+                'srcset': image_srcset(image['variants'], media.url),
+                'alt_text': image['alt_text'],
+                'is_primary': image['is_primary'],
+                'order': image['order'],
+            })
+        return by_room
+
+    def amenities_by_room(self, room_ids):
+        by_room = {}
+        amenities = Amenity.objects.filter(rooms__in=room_ids).values('id', 'name', 'icon', room_id=F('rooms__id'))
+        for amenity in amenities:
+            room_id = amenity.pop('room_id')
+            by_room.setdefault(room_id, []).append(amenity)
+        return by_room
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        room_ids = [row['id'] for row in rows]
+        images = self.images_by_room(room_ids, MediaUrls(RoomImage, 'image', self.request))
+        amenities = self.amenities_by_room(room_ids)
+
+        data = []
+        for row in rows:
+            room_images = images.get(row['id'], [])
+            primary = next((image for image in room_images if image['is_primary']), None)
+            if primary is None and room_images:
+                primary = room_images[0]
+
+            bed_configuration = row['bed_configuration']
+            view_type = row['view_type']
+            data.append({
+                'id': row['id'],
+                'name': row['name'],
+                'slug': row['slug'],
+                'room_type': row['room_type'],
+                'capacity': row['capacity'],
+                'max_occupancy': row['max_occupancy'],
+                'bed_configuration': bed_configuration,
+                'bed_configuration_display': (
+                    None if bed_configuration is None
+                    else self.bed_configuration_labels.get(bed_configuration, bed_configuration)
+                ),
+                'number_of_beds': row['number_of_beds'],
+                'size_sqm': self.format_size(row['size_sqm']),
+                'view_type': view_type,
+                'view_type_display': (
+                    None if view_type is None else self.view_type_labels.get(view_type, view_type)
+                ),
+                'has_balcony': row['has_balcony'],
+                'base_price_per_night': self.format_price(row['base_price_per_night']),
+                'primary_image': primary['image_display'] if primary else None,
+                'images': room_images,
+                'amenities': amenities.get(row['id'], []),
+                'wheelchair_accessible': row['wheelchair_accessible'],
+            })
+        return data
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from apps.core.cache import bump_generation
+from apps.rooms.models import Room
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute Room.feature_mask from the boolean feature columns, for rows '
+        'written without Room.save() (QuerySet.update(), raw SQL, fixtures)'
+    )
+
+    def handle(self, *args, **options):
+        expression = Room.feature_mask_expression()
+        updated = Room.objects.alias(expected_mask=expression).exclude(
+            feature_mask=F('expected_mask')
+        ).update(feature_mask=expression)
+
+        if updated:
+            bump_generation('rooms.Room')
+        self.stdout.write(self.style.SUCCESS(f'Updated {updated} of {Room.objects.count()} rooms'))
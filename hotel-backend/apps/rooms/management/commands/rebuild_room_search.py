@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from apps.rooms.models import Room
+from apps.rooms.search import create_search_index, drop_search_index, fts_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the FTS5 room search index (rooms_fts) from the rooms table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recreate', action='store_true',
+            help='Drop and recreate the index table and triggers first (e.g. after changing the tokenizer)'
+        )
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('Room search uses SQLite FTS5; the default database is not SQLite')
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if options['recreate']:
+                drop_search_index(cursor)
+            create_search_index(cursor)
+            rebuild_search_index(cursor)
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {Room.objects.count()} rooms'))
@@ -0,0 +1,27 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from apps.rooms.models import Room
+from apps.rooms.services import AvailabilitySummaryService
+
+
+class Command(BaseCommand):
+    help = (
+        'Store fresh availability summaries for rooms whose summary is missing or '
+        'from an earlier day (run daily; room detail reads do not write them)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Refresh every room, not only stale ones')
+
+    def handle(self, *args, **options):
+        rooms = Room.objects.all()
+        if not options['all']:
+            rooms = rooms.filter(
+                Q(availability_summary__isnull=True) | ~Q(availability_summary__computed_on=date.today())
+            )
+
+        room_ids = list(rooms.values_list('id', flat=True))
+        for room_id in room_ids:
+            AvailabilitySummaryService.refresh(room_id)
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {len(room_ids)} availability summaries'))
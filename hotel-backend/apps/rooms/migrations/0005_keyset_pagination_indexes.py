@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0004_room_accessible_bathroom_room_air_conditioning_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roomavailability',
+            index=models.Index(fields=['start_date', 'id'], name='room_availa_start_d_fb403f_idx'),
+        ),
+    ]
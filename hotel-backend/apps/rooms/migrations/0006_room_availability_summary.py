@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:35
+
+from datetime import date
+
+import django.db.models.deletion
+from django.db import migrations, models
+from rest_framework import serializers
+
+
+def populate_summaries(apps, schema_editor):
+    """Compute the availability summary of every existing room"""
+    Room = apps.get_model('rooms', 'Room')
+    RoomAvailability = apps.get_model('rooms', 'RoomAvailability')
+    RoomAvailabilitySummary = apps.get_model('rooms', 'RoomAvailabilitySummary')
+
+    # Frozen copy of RoomAvailabilitySerializer's output at this migration
+    class PeriodSerializer(serializers.ModelSerializer):
+        room_name = serializers.CharField(source='room.name', read_only=True)
+        status_display = serializers.CharField(source='get_status_display', read_only=True)
+
+        class Meta:
+            model = RoomAvailability
+            fields = [
+                'id', 'room', 'room_name', 'start_date', 'end_date',
+                'status', 'status_display', 'notes', 'booking',
+                'created_at', 'updated_at'
+            ]
+
+    today = date.today()
+    summaries = []
+    for room_id in Room.objects.values_list('id', flat=True).iterator():
+        upcoming_periods = RoomAvailability.objects.filter(
+            room_id=room_id,
+            end_date__gte=today
+        ).select_related('room').order_by('start_date')[:10]
+        busy_today = RoomAvailability.objects.filter(
+            room_id=room_id,
+            start_date__lte=today,
+            end_date__gte=today
+        ).exists()
+        summaries.append(RoomAvailabilitySummary(
+            room_id=room_id,
+            upcoming_periods=PeriodSerializer(upcoming_periods, many=True).data,
+            is_available_today=not busy_today,
+            computed_on=today,
+        ))
+    RoomAvailabilitySummary.objects.bulk_create(summaries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomAvailabilitySummary',
+            fields=[
+                ('room', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='availability_summary', serialize=False, to='rooms.room')),
+                ('upcoming_periods', models.JSONField(blank=True, default=list)),
+                ('is_available_today', models.BooleanField(default=True)),
+                ('computed_on', models.DateField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Room Availability Summaries',
+                'db_table': 'room_availability_summaries',
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:47
+
+from django.db import migrations, models
+
+# Room.FEATURE_FIELDS as of this migration
+FEATURE_FIELDS = (
+    'wifi', 'air_conditioning', 'tv', 'telephone', 'work_desk', 'storage',
+    'safe', 'minibar', 'coffee_maker', 'iron_board', 'has_balcony', 'is_soundproof',
+    'wheelchair_accessible', 'accessible_bathroom', 'has_kitchenette', 'has_seating_area',
+)
+
+
+def backfill_feature_masks(apps, schema_editor):
+    """Compute every room's mask in a single UPDATE"""
+    Room = apps.get_model('rooms', 'Room')
+    bits = [
+        models.Case(models.When(**{field: True}, then=models.Value(1 << bit)), default=models.Value(0))
+        for bit, field in enumerate(FEATURE_FIELDS)
+    ]
+    Room.objects.update(feature_mask=sum(bits[1:], bits[0]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rooms', '0007_room_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='feature_mask',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_feature_masks, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.text import slugify
 
 
@@ -131,19 +131,56 @@ class Room(models.Model):
     has_kitchenette = models.BooleanField(default=False, verbose_name="Kitchenette/Full Kitchen")
     has_seating_area = models.BooleanField(default=False, verbose_name="In-Room Seating Area")
 
+    # Bit i is set when FEATURE_FIELDS[i] is true; maintained by save()
+    feature_mask = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+
     # Legacy fields
     amenities = models.ManyToManyField(Amenity, related_name='rooms', blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Boolean features packed into feature_mask. Append only: a feature's
+    # position is its bit, so reordering would change stored masks.
+    FEATURE_FIELDS = (
+        'wifi', 'air_conditioning', 'tv', 'telephone', 'work_desk', 'storage',
+        'safe', 'minibar', 'coffee_maker', 'iron_board', 'has_balcony', 'is_soundproof',
+        'wheelchair_accessible', 'accessible_bathroom', 'has_kitchenette', 'has_seating_area',
+    )
+
     class Meta:
         db_table = 'rooms'
         ordering = ['room_type', 'name']
 
+    @classmethod
+    def feature_bits(cls, features) -> int:
+        """Mask with the bit of every named feature set"""
+        mask = 0
+        for feature in features:
+            mask |= 1 << cls.FEATURE_FIELDS.index(feature)
+        return mask
+
+    @classmethod
+    def feature_mask_expression(cls):
+        """SQL expression computing feature_mask from the boolean columns (for bulk backfills)"""
+        bits = [
+            models.Case(models.When(**{field: True}, then=models.Value(1 << bit)), default=models.Value(0))
+            for bit, field in enumerate(cls.FEATURE_FIELDS)
+        ]
+        return sum(bits[1:], bits[0])
+
+    def compute_feature_mask(self) -> int:
+        return self.feature_bits(field for field in self.FEATURE_FIELDS if getattr(self, field))
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+
+        self.feature_mask = self.compute_feature_mask()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(self.FEATURE_FIELDS):
+            kwargs['update_fields'] = {*update_fields, 'feature_mask'}
+
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -155,6 +192,8 @@ class RoomImage(models.Model):
     room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='room_images/', null=True, blank=True)
     image_url = models.URLField(max_length=500, blank=True)  # Optional URL fallback
+    # Resized WebP/JPEG copies of `image`, see apps.core.images
+    variants = models.JSONField(default=dict, blank=True, editable=False)
     alt_text = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
@@ -222,6 +261,14 @@ class RoomAvailability(models.Model):
         db_table = 'room_availability'
         ordering = ['start_date']
         verbose_name_plural = 'Room Availability Periods'
+        indexes = [
+            models.Index(fields=['start_date', 'id']),  # keyset pagination
+        ]
+
+    def save(self, *args, **kwargs):
+        # The RoomNight inventory is synced from post_save; keep it in this transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.room.name}: {self.status} ({self.start_date} to {self.end_date})"
@@ -230,3 +277,31 @@ class RoomAvailability(models.Model):
         from django.core.exceptions import ValidationError
         if self.start_date and self.end_date and self.start_date > self.end_date:
             raise ValidationError('End date must be after start date')
+
+
+class RoomAvailabilitySummary(models.Model):
+    """
+    Precomputed availability fields for the room detail page.
+
+    Refreshed whenever the room's availability periods change (bookings
+    hold their nights through BUSY periods). "Today" moves on its own, so
+    stale rows (computed_on) are recomputed in memory on read and stored
+    again by the refresh_availability_summaries command.
+    """
+    room = models.OneToOneField(
+        Room,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='availability_summary'
+    )
+    upcoming_periods = models.JSONField(default=list, blank=True)  # Serialized RoomAvailability rows
+    is_available_today = models.BooleanField(default=True)
+    computed_on = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'room_availability_summaries'
+        verbose_name_plural = 'Room Availability Summaries'
+
+    def __str__(self):
+        return f"Availability summary for room {self.room_id} ({self.computed_on})"
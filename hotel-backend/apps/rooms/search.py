@@ -0,0 +1,137 @@
+import re
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+
+# FTS5 index over the rooms table (external content, kept in sync by triggers)
+FTS_TABLE = 'rooms_fts'
+SEARCH_COLUMNS = ('name', 'description', 'special_perks', 'bathroom_features')
+
+# bm25 weight per column, in SEARCH_COLUMNS order: name matches rank highest
+COLUMN_WEIGHTS = (10.0, 1.0, 2.0, 1.0)
+
+# Most tokens taken from a query, and most ranked matches considered
+MAX_QUERY_TOKENS = 10
+MAX_MATCHES = 1000
+
+
+def search_tokens(text):
+    return re.findall(r'\w+', text or '')[:MAX_QUERY_TOKENS]
+
+
+def build_match_query(text):
+    """
+    Turn free text into a safe FTS5 MATCH expression: every word quoted (so
+    FTS5 operators and punctuation in user input are inert), all words
+    required, and the last one matched as a prefix for search-as-you-type.
+    """
+    tokens = search_tokens(text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def create_search_index(cursor):
+    columns = ', '.join(SEARCH_COLUMNS)
+    new_values = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+    old_values = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{columns}, content='rooms', content_rowid='id', "
+        f"tokenize='porter unicode61 remove_diacritics 2')"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON rooms BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON rooms BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON rooms BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END"
+    )
+
+
+def drop_search_index(cursor):
+    for suffix in ('ai', 'ad', 'au'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+    cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def ensure_search_index(using='default', **kwargs):
+    """
+    post_migrate hook: SQLite rebuilds a table for most ALTERs, which drops its
+    triggers, so any later migration on rooms would silently stop indexing.
+    Recreate whatever is missing and re-read the content table.
+    """
+    from django.db import connections
+    from django.db.migrations.recorder import MigrationRecorder
+
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+            [FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au']
+        )
+        if cursor.fetchone()[0] == 4:
+            return
+        # Migrated back before the index existed: nothing to repair
+        if ('rooms', '0007_room_search_index') not in MigrationRecorder(connection).applied_migrations():
+            return
+        create_search_index(cursor)
+        rebuild_search_index(cursor)
+
+
+def rebuild_search_index(cursor):
+    """Re-read every room from the content table"""
+    cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def ranked_room_ids(text):
+    """Ids of rooms matching the text, best match first (bm25)"""
+    match = build_match_query(text)
+    if match is None:
+        return []
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+            [match, MAX_MATCHES]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_rooms(queryset, text):
+    """
+    Filter a Room queryset to the rooms matching `text`, ordered by relevance.
+    Off SQLite it falls back to icontains over the same columns, unranked.
+    """
+    tokens = search_tokens(text)
+    if not tokens:
+        return queryset
+
+    if not fts_available():
+        for token in tokens:
+            queryset = queryset.filter(
+                Q(*[Q(**{f'{column}__icontains': token}) for column in SEARCH_COLUMNS], _connector=Q.OR)
+            )
+        return queryset
+
+    room_ids = ranked_room_ids(text)
+    if not room_ids:
+        return queryset.none()
+    return queryset.filter(id__in=room_ids).order_by(
+        Case(*[When(id=room_id, then=position) for position, room_id in enumerate(room_ids)],
+             output_field=IntegerField())
+    )
@@ -1,5 +1,9 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 from apps.rooms.models import Room, RoomImage, Amenity, RoomAvailability
+from apps.rooms.services import AvailabilitySummaryService
+from apps.core.fieldsets import SparseFieldsetSerializerMixin
+from apps.core.images import SrcsetField
 
 
 class AmenitySerializer(serializers.ModelSerializer):
@@ -10,10 +14,11 @@ class AmenitySerializer(serializers.ModelSerializer):
 
 class RoomImageSerializer(serializers.ModelSerializer):
     image_display = serializers.SerializerMethodField()
+    srcset = SrcsetField()
 
     class Meta:
         model = RoomImage
-        fields = ['id', 'image', 'image_url', 'image_display', 'alt_text', 'is_primary', 'order']
+        fields = ['id', 'image', 'image_url', 'image_display', 'srcset', 'alt_text', 'is_primary', 'order']
 
     def get_image_display(self, obj):
         """Return the full URL for the image"""
@@ -46,7 +51,7 @@ class RoomImageCreateSerializer(serializers.ModelSerializer):
         return data
 
 
-class RoomListSerializer(serializers.ModelSerializer):
+class RoomListSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Lightweight serializer for room listings"""
     primary_image = serializers.SerializerMethodField()
     images = serializers.SerializerMethodField()
@@ -63,13 +68,36 @@ class RoomListSerializer(serializers.ModelSerializer):
             'base_price_per_night', 'primary_image', 'images', 'amenities', 'wheelchair_accessible'
         ]
 
+    # Images embedded per room in list responses
+    IMAGE_LIMIT = 5
+
+    expandable_fields = ('amenities',)
+    field_sources = {'primary_image': ('images',), 'images': ('images',)}
+
+    @classmethod
+    def images_prefetch(cls, lookup='images'):
+        """
+        Prefetch only the first IMAGE_LIMIT images of each room (one query,
+        using a window function), in the model's primary-first ordering.
+        Sliced prefetches need a to_attr; the images land on room.list_images.
+        """
+        return Prefetch(lookup, queryset=RoomImage.objects.all()[:cls.IMAGE_LIMIT], to_attr='list_images')
+
+    def _list_images(self, obj):
+        """First IMAGE_LIMIT images, from images_prefetch() when it was used"""
+        images = getattr(obj, 'list_images', None)
+        if images is None:
+            images = obj.images.all()[:self.IMAGE_LIMIT]  # Served from a plain prefetch cache when available
+        return images
+
     def get_primary_image(self, obj):
-        # Try to get primary image first
-        image = obj.images.filter(is_primary=True).first()
+        # Resolve from the prefetched images (primary first, then by order)
+        images = self._list_images(obj)
+        image = next((image for image in images if image.is_primary), None)
 
         # If no primary image, get the first image
-        if not image:
-            image = obj.images.first()
+        if not image and images:
+            image = images[0]
 
         if not image:
             return None
@@ -84,11 +112,28 @@ class RoomListSerializer(serializers.ModelSerializer):
 
     def get_images(self, obj):
         """Return first 5 images for list view (ordered by is_primary, then order)"""
-        images = obj.images.all()[:5]  # Limit to first 5 images for performance
+        images = self._list_images(obj)
         return RoomImageSerializer(images, many=True, context=self.context).data
 
 
-class RoomDetailSerializer(serializers.ModelSerializer):
+class RoomPricedListSerializer(RoomListSerializer):
+    """Room listing with the stay price for the searched dates (expects 'quotes' in context)"""
+    total_price = serializers.SerializerMethodField()
+    nightly_rates = serializers.SerializerMethodField()
+
+    class Meta(RoomListSerializer.Meta):
+        fields = RoomListSerializer.Meta.fields + ['total_price', 'nightly_rates']
+
+    def get_total_price(self, obj):
+        quote = self.context.get('quotes', {}).get(obj.id)
+        return str(quote.total) if quote else None
+
+    def get_nightly_rates(self, obj):
+        quote = self.context.get('quotes', {}).get(obj.id)
+        return quote.breakdown() if quote else None
+
+
+class RoomDetailSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """Full room details"""
     images = RoomImageSerializer(many=True, read_only=True)
     amenities = AmenitySerializer(many=True, read_only=True)
@@ -140,23 +185,23 @@ class RoomDetailSerializer(serializers.ModelSerializer):
             'availability_periods', 'is_currently_available'
         ]
 
+    expandable_fields = ('amenities',)
+    field_sources = {
+        'availability_periods': ('name', 'availability_summary__upcoming_periods', 'availability_summary__computed_on'),
+        'is_currently_available': ('availability_summary__is_available_today', 'availability_summary__computed_on'),
+    }
+
     def get_availability_periods(self, obj):
-        """Get upcoming busy periods for this room"""
-        from datetime import date
-        upcoming_periods = obj.availability_periods.filter(
-            end_date__gte=date.today()
-        ).order_by('start_date')[:10]  # Next 10 periods
-        return RoomAvailabilitySerializer(upcoming_periods, many=True).data
+        """Upcoming busy periods, from the precomputed availability summary"""
+        # Renaming a room does not refresh its summary; the name comes from the room
+        return [
+            {**period, 'room_name': obj.name}
+            for period in AvailabilitySummaryService.get(obj).upcoming_periods
+        ]
 
     def get_is_currently_available(self, obj):
-        """Check if room is available today"""
-        from datetime import date
-        today = date.today()
-        busy_today = obj.availability_periods.filter(
-            start_date__lte=today,
-            end_date__gte=today
-        ).exists()
-        return not busy_today
+        """Whether the room is free today, from the precomputed availability summary"""
+        return AvailabilitySummaryService.get(obj).is_available_today
 
 
 class RoomCreateUpdateSerializer(serializers.ModelSerializer):
@@ -0,0 +1,77 @@
+from datetime import date
+from django.db import transaction
+from apps.rooms.models import Room, RoomAvailability, RoomAvailabilitySummary
+
+
+class AvailabilitySummaryService:
+    """Maintains RoomAvailabilitySummary rows for the room detail endpoint"""
+
+    # Upcoming periods shown on the detail page
+    UPCOMING_LIMIT = 10
+
+    @staticmethod
+    def compute(room_id: int) -> RoomAvailabilitySummary:
+        """A room's summary computed from its availability periods (not saved)"""
+        from apps.rooms.serializers import RoomAvailabilitySerializer
+
+        today = date.today()
+        upcoming_periods = RoomAvailability.objects.filter(
+            room_id=room_id,
+            end_date__gte=today
+        ).select_related('room').order_by('start_date')[:AvailabilitySummaryService.UPCOMING_LIMIT]
+        busy_today = RoomAvailability.objects.filter(
+            room_id=room_id,
+            start_date__lte=today,
+            end_date__gte=today
+        ).exists()
+
+        return RoomAvailabilitySummary(
+            room_id=room_id,
+            upcoming_periods=RoomAvailabilitySerializer(upcoming_periods, many=True).data,
+            is_available_today=not busy_today,
+            computed_on=today,
+        )
+
+    @staticmethod
+    def refresh(room_id: int) -> RoomAvailabilitySummary:
+        """Recompute a room's summary and store it"""
+        summary = AvailabilitySummaryService.compute(room_id)
+        summary, _ = RoomAvailabilitySummary.objects.update_or_create(
+            room_id=room_id,
+            defaults={
+                'upcoming_periods': summary.upcoming_periods,
+                'is_available_today': summary.is_available_today,
+                'computed_on': summary.computed_on,
+            }
+        )
+        return summary
+
+    @staticmethod
+    def refresh_on_commit(room_id: int):
+        """
+        Refresh once the current transaction commits, if the room still exists.
+        Used for deletes, which may be cascading from the room itself.
+        """
+        def refresh():
+            if Room.objects.filter(pk=room_id).exists():
+                AvailabilitySummaryService.refresh(room_id)
+        transaction.on_commit(refresh)
+
+    @staticmethod
+    def get(room) -> RoomAvailabilitySummary:
+        """
+        The room's current summary: the select_related one when it is from
+        today, otherwise recomputed in memory and cached on the room so later
+        reads reuse it. Reads never write; stored summaries are refreshed by
+        the Room and RoomAvailability signals and the
+        refresh_availability_summaries command.
+        """
+        try:
+            summary = room.availability_summary
+        except RoomAvailabilitySummary.DoesNotExist:
+            summary = None
+
+        if summary is None or summary.computed_on != date.today():
+            summary = AvailabilitySummaryService.compute(room.id)
+            room.availability_summary = summary
+        return summary
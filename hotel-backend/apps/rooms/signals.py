@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.rooms.models import Room, RoomAvailability
+from apps.rooms.services import AvailabilitySummaryService
+
+
+@receiver(post_save, sender=Room)
+def create_availability_summary(sender, instance, created, raw=False, **kwargs):
+    """Give a new room its summary row so detail reads never recompute it"""
+    if created and not raw:
+        AvailabilitySummaryService.refresh(instance.pk)
+
+
+@receiver(post_save, sender=RoomAvailability)
+def refresh_availability_summary(sender, instance, raw=False, **kwargs):
+    """Recompute the room's detail-page availability when a period changes"""
+    if not raw:
+        AvailabilitySummaryService.refresh(instance.room_id)
+
+
+@receiver(post_delete, sender=RoomAvailability)
+def refresh_availability_summary_on_delete(sender, instance, **kwargs):
+    AvailabilitySummaryService.refresh_on_commit(instance.room_id)
+
@@ -1,3 +1,503 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.bookings.models import Booking, SeasonalPrice
+from apps.bookings.services import BookingService
+from apps.core.pagination import CursorOrPageNumberPagination
+from apps.rooms.models import Amenity, Room, RoomAvailability, RoomAvailabilitySummary, RoomImage
+from apps.rooms.services import AvailabilitySummaryService
+from apps.users.models import CustomUser
 
-# Create your tests here.
+
+class RoomListQueryCountTests(TestCase):
+    """Room listings must cost a constant number of queries, however many rooms and images"""
+
+    @classmethod
+    def setUpTestData(cls):
+        amenities = [Amenity.objects.create(name=name) for name in ('WiFi', 'Pool')]
+        for index in range(20):
+            room = Room.objects.create(
+                name=f'Room {index}',
+                description='A room',
+                base_price_per_night=Decimal('100.00'),
+            )
+            room.amenities.set(amenities)
+            for order in range(7):
+                RoomImage.objects.create(
+                    room=room,
+                    image_url=f'https://example.com/{index}/{order}.jpg',
+                    order=order,
+                    is_primary=(order == 3),
+                )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_room_list_query_count_is_constant(self):
+        # validators aggregate, COUNT, rooms, windowed images prefetch, amenities prefetch
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/rooms/')
+
+        self.assertEqual(response.status_code, 200)
+        rooms = response.json()['results']
+        self.assertEqual(len(rooms), 20)
+        for room in rooms:
+            index = room['name'].split()[-1]
+            self.assertEqual(room['primary_image'], f'https://example.com/{index}/3.jpg')
+            self.assertEqual(len(room['images']), 5)
+            self.assertTrue(room['images'][0]['is_primary'])
+            self.assertEqual(len(room['amenities']), 2)
+
+    def test_fast_serializer_renders_identical_json(self):
+        room = Room.objects.get(name='Room 1')
+        room.size_sqm = Decimal('28.5')
+        room.save()
+        RoomImage.objects.create(room=room, image='room_images/sea view.jpg', order=0, is_primary=True)
+
+        for query in ('', '?ordering=-base_price_per_night', '?page=1&room_type=STANDARD'):
+            cache.clear()
+            regular = self.client.get(f'/api/rooms/{query}')
+            cache.clear()
+            with override_settings(FAST_LIST_SERIALIZERS=True):
+                fast = self.client.get(f'/api/rooms/{query}')
+            self.assertEqual(fast.status_code, 200)
+            self.assertEqual(fast.content, regular.content)
+
+    def test_sparse_fields_trim_output_and_query(self):
+        # validators aggregate, COUNT, rooms (no images / amenities prefetch)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/rooms/?fields=id,name,view_type_display')
+
+        self.assertEqual(len(queries), 3)
+        self.assertNotIn('"rooms"."description"', queries[-1]['sql'])
+        for room in response.json()['results']:
+            self.assertEqual(set(room), {'id', 'name', 'view_type_display'})
+
+    def test_unexpanded_amenities_are_ids(self):
+        response = self.client.get('/api/rooms/?fields=id,amenities&expand=')
+
+        amenity_ids = sorted(Amenity.objects.values_list('id', flat=True))
+        for room in response.json()['results']:
+            self.assertEqual(sorted(room['amenities']), amenity_ids)
+
+    def test_facets_count_every_option_in_one_query(self):
+        Room.objects.filter(name__in=['Room 0', 'Room 1']).update(
+            room_type=Room.RoomType.SUITE, minibar=True, base_price_per_night=Decimal('300.00')
+        )
+        Room.objects.filter(name='Room 2').update(room_type=Room.RoomType.SUITE, wheelchair_accessible=True)
+
+        # validators aggregate, facet aggregate
+        with self.assertNumQueries(2):
+            facets = self.client.get('/api/rooms/facets/').json()
+
+        self.assertEqual(facets['total'], 20)
+        room_types = {item['value']: item['count'] for item in facets['room_type']}
+        self.assertEqual(room_types[Room.RoomType.SUITE], 3)
+        self.assertEqual(room_types[Room.RoomType.STANDARD], 17)
+        features = {item['field']: item for item in facets['features']}
+        self.assertEqual(features['minibar']['count'], 2)
+        self.assertEqual(features['minibar']['label'], 'Mini-bar/Fridge')
+        accessibility = {item['field']: item['count'] for item in facets['accessibility']}
+        self.assertEqual(accessibility['wheelchair_accessible'], 1)
+
+        # Honours the list filters
+        filtered = self.client.get('/api/rooms/facets/?min_price=200').json()
+        self.assertEqual(filtered['total'], 2)
+        self.assertEqual({item['value']: item['count'] for item in filtered['room_type']}[Room.RoomType.SUITE], 2)
+
+    def test_price_sorted_list_itemizes_only_the_page(self):
+        check_in = date.today() + timedelta(days=30)
+        query = f'?check_in={check_in}&check_out={check_in + timedelta(days=3)}&ordering=-total_price&page_size=5'
+        response = self.client.get('/api/rooms/' + query)
+
+        self.assertEqual(response.status_code, 200)
+        for room in response.json()['results']:
+            self.assertEqual(room['total_price'], '300.00')
+            self.assertEqual(len(room['nightly_rates']), 3)
+
+    def test_overlong_stay_is_rejected(self):
+        check_in = date.today() + timedelta(days=30)
+        response = self.client.get(f'/api/rooms/?check_in={check_in}&check_out={check_in + timedelta(days=367)}')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('check_out', response.json())
+
+    def test_primary_image_falls_back_to_first_image(self):
+        room = Room.objects.get(name='Room 0')
+        room.images.update(is_primary=False)
+
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/rooms/')
+
+        listed = next(item for item in response.json()['results'] if item['id'] == room.id)
+        self.assertEqual(listed['primary_image'], 'https://example.com/0/0.jpg')
+
+
+class RoomDetailAvailabilitySummaryTests(TestCase):
+    """Room detail availability is served from the precomputed summary"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.room = Room.objects.create(name='Summary Room', description='x', base_price_per_night=Decimal('100.00'))
+
+    def test_new_room_gets_a_summary_row(self):
+        summary = RoomAvailabilitySummary.objects.get(room=self.room)
+        self.assertEqual(summary.computed_on, date.today())
+        self.assertEqual(summary.upcoming_periods, [])
+        self.assertTrue(summary.is_available_today)
+
+    def test_detail_reads_summary_in_one_query_plus_prefetches(self):
+        # validators aggregate, room + summary join, images prefetch, amenities prefetch
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/rooms/{self.room.slug}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['availability_periods'], [])
+        self.assertTrue(response.json()['is_currently_available'])
+
+    def test_summary_follows_period_changes(self):
+        today = date.today()
+        period = RoomAvailability.objects.create(
+            room=self.room, start_date=today, end_date=today + timedelta(days=2),
+            status=RoomAvailability.Status.MAINTENANCE
+        )
+
+        data = self.client.get(f'/api/rooms/{self.room.slug}/').json()
+        self.assertFalse(data['is_currently_available'])
+        self.assertEqual([p['id'] for p in data['availability_periods']], [period.id])
+        self.assertEqual(data['availability_periods'][0]['room_name'], 'Summary Room')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            period.start_date = today + timedelta(days=1)
+            period.save()
+        self.assertTrue(self.client.get(f'/api/rooms/{self.room.slug}/').json()['is_currently_available'])
+
+    def test_detail_fields_subset(self):
+        # validators aggregate, room + summary join
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/rooms/{self.room.slug}/?fields=name,is_currently_available')
+
+        self.assertEqual(response.json(), {'name': 'Summary Room', 'is_currently_available': True})
+
+    def test_stale_summary_is_recomputed_without_writing(self):
+        today = date.today()
+        RoomAvailability.objects.create(
+            room=self.room, start_date=today, end_date=today + timedelta(days=2),
+            status=RoomAvailability.Status.MAINTENANCE
+        )
+        yesterday = today - timedelta(days=1)
+        RoomAvailabilitySummary.objects.filter(room=self.room).update(computed_on=yesterday, is_available_today=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(f'/api/rooms/{self.room.slug}/').json()
+
+        self.assertFalse(data['is_currently_available'])
+        self.assertFalse(any(query['sql'].startswith(('INSERT', 'UPDATE')) for query in queries))
+        self.assertEqual(RoomAvailabilitySummary.objects.get(room=self.room).computed_on, yesterday)
+
+        call_command('refresh_availability_summaries', stdout=StringIO())
+        self.assertEqual(RoomAvailabilitySummary.objects.get(room=self.room).computed_on, today)
+
+    def test_stale_summary_is_computed_once_per_room(self):
+        RoomAvailabilitySummary.objects.filter(room=self.room).update(computed_on=date.today() - timedelta(days=1))
+
+        with mock.patch.object(
+            AvailabilitySummaryService, 'compute', wraps=AvailabilitySummaryService.compute
+        ) as compute:
+            response = self.client.get(f'/api/rooms/{self.room.slug}/')
+
+        self.assertEqual(response.status_code, 200)
+        compute.assert_called_once_with(self.room.id)
+
+    def test_renamed_room_shows_its_new_name(self):
+        today = date.today()
+        RoomAvailability.objects.create(room=self.room, start_date=today, end_date=today + timedelta(days=2))
+        Room.objects.filter(pk=self.room.pk).update(name='Renamed Room')
+
+        data = self.client.get(f'/api/rooms/{self.room.slug}/').json()
+        self.assertEqual(data['availability_periods'][0]['room_name'], 'Renamed Room')
+
+
+class RoomAvailabilityPaginationTests(TestCase):
+    """The availability list pages by cursor on (start_date, id), or by number on request"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(username='staff', password='x', role='STAFF'))
+        room = Room.objects.create(name='Paged Room', description='x', base_price_per_night=Decimal('100.00'))
+        start = date.today() + timedelta(days=10)
+        self.periods = [
+            RoomAvailability.objects.create(
+                room=room, start_date=start + timedelta(days=offset * 5), end_date=start + timedelta(days=offset * 5 + 1)
+            )
+            for offset in (2, 0, 1)
+        ]
+
+    def test_pages_follow_the_cursor(self):
+        with mock.patch.object(CursorOrPageNumberPagination, 'page_size', 2):
+            with CaptureQueriesContext(connection) as queries:
+                first = self.client.get('/api/room-availability/').json()
+            second = self.client.get(first['next']).json()
+
+        self.assertNotIn('count', first)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries))
+        self.assertEqual(len(first['results']), 2)
+        self.assertIsNone(second['next'])
+        ids = [period['id'] for period in first['results'] + second['results']]
+        self.assertEqual(ids, [self.periods[1].id, self.periods[2].id, self.periods[0].id])
+
+    def test_page_number_opt_in(self):
+        data = self.client.get('/api/room-availability/?page=1').json()
+
+        self.assertEqual(data['count'], 3)
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(self.client.get('/api/room-availability/?page=2').status_code, 404)
+
+
+class AvailabilityCalendarTests(TestCase):
+    """Staff rooms x days calendar: precedence, clipping and run-length encoding"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(username='staff', password='x', role='STAFF'))
+        self.room = Room.objects.create(name='Calendar Room', description='x', base_price_per_night=Decimal('100.00'))
+        self.empty = Room.objects.create(name='Empty Room', description='x', base_price_per_night=Decimal('100.00'))
+        self.start = date.today() + timedelta(days=30)
+
+        # Overlapping rows cannot be saved through the inventory, so insert them directly
+        def day(offset):
+            return self.start + timedelta(days=offset)
+        RoomAvailability.objects.bulk_create([
+            RoomAvailability(room=self.room, start_date=day(-3), end_date=day(6), status=RoomAvailability.Status.BLOCKED),
+            RoomAvailability(room=self.room, start_date=day(2), end_date=day(5), status=RoomAvailability.Status.MAINTENANCE),
+        ])
+        self.first, self.second = Booking.objects.bulk_create([
+            Booking(room=self.room, check_in_date=day(4), check_out_date=day(7), guest_name='First',
+                    guest_email='a@example.com', guest_phone='555', total_price=Decimal('300.00')),
+            Booking(room=self.room, check_in_date=day(7), check_out_date=day(12), guest_name='Second',
+                    guest_email='b@example.com', guest_phone='555', total_price=Decimal('500.00')),
+        ])
+
+    def calendar(self, days=10, **params):
+        query = {'start': self.start, 'end': self.start + timedelta(days=days - 1), **params}
+        return self.client.get('/api/rooms/calendar/', query)
+
+    def test_precedence_and_clipping(self):
+        data = self.calendar().json()
+
+        self.assertEqual((data['days'], data['encoding']), (10, 'dense'))
+        rows = {row['id']: row for row in data['rooms']}
+        self.assertEqual(rows[self.room.id]['statuses'], [
+            'blocked', 'blocked', 'maintenance', 'maintenance', 'booked', 'booked', 'booked',
+            'booked', 'booked', 'booked',
+        ])
+        self.assertEqual(
+            rows[self.room.id]['booking_ids'],
+            [None] * 4 + [self.first.id] * 3 + [self.second.id] * 3
+        )
+        self.assertEqual(rows[self.empty.id]['statuses'], ['free'] * 10)
+
+    def test_run_length_encoding(self):
+        rows = {row['id']: row for row in self.calendar(encoding='rle').json()['rooms']}
+
+        # Runs merge equal days but never two different bookings
+        self.assertEqual(rows[self.room.id]['runs'], [
+            ['blocked', 2, None], ['maintenance', 2, None],
+            ['booked', 3, self.first.id], ['booked', 3, self.second.id],
+        ])
+        self.assertEqual(rows[self.empty.id]['runs'], [['free', 10, None]])
+
+    def test_parameters_are_validated(self):
+        self.assertEqual(self.calendar(days=366).status_code, 200)
+        self.assertEqual(self.calendar(days=367).status_code, 400)
+        self.assertEqual(self.calendar(days=0).status_code, 400)  # end before start
+        self.assertEqual(self.client.get('/api/rooms/calendar/', {'start': self.start}).status_code, 400)
+        self.assertEqual(self.client.get('/api/rooms/calendar/', {'start': 'soon', 'end': 'later'}).status_code, 400)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(CustomUser.objects.create_user(username='guest', password='x'))
+        self.assertEqual(self.calendar().status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.calendar().status_code, 401)
+
+
+class FlexibleSearchTests(TestCase):
+    """Cheapest N-night stays inside a date window"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.start = date.today() + timedelta(days=30)
+        self.seaside = Room.objects.create(name='Seaside', description='x', base_price_per_night=Decimal('100.00'))
+        self.courtyard = Room.objects.create(name='Courtyard', description='x', base_price_per_night=Decimal('80.00'))
+        # Seaside: nights 2-3 booked, nights 6-7 on offer at 50.00
+        BookingService.create_booking(
+            room=self.seaside, check_in_date=self.day(2), check_out_date=self.day(4),
+            guest_name='Guest', guest_email='guest@example.com', guest_phone='555', total_price=Decimal('200.00')
+        )
+        SeasonalPrice.objects.create(
+            room=self.seaside, name='Offer', start_date=self.day(6), end_date=self.day(7),
+            price_per_night=Decimal('50.00')
+        )
+
+    def day(self, offset):
+        return self.start + timedelta(days=offset)
+
+    def search(self, days=10, nights=2, **params):
+        query = {'window_start': self.start, 'window_end': self.day(days), 'nights': nights, **params}
+        return self.client.get('/api/rooms/flexible-search/', query)
+
+    def test_cheapest_stays_skip_occupied_nights(self):
+        rooms = self.search().json()['rooms']
+
+        # Cheapest room first; within a room cheapest stay first, earlier dates on ties
+        self.assertEqual([room['id'] for room in rooms], [self.seaside.id, self.courtyard.id])
+        self.assertEqual(
+            [(stay['check_in'], stay['total_price']) for stay in rooms[0]['stays']],
+            [(str(self.day(6)), '100.00'), (str(self.day(5)), '150.00'), (str(self.day(7)), '150.00')]
+        )
+        self.assertEqual(
+            [(stay['check_in'], stay['check_out'], stay['total_price']) for stay in rooms[1]['stays']],
+            [(str(self.day(offset)), str(self.day(offset + 2)), '160.00') for offset in range(3)]
+        )
+
+    def test_every_free_start_is_a_candidate(self):
+        stays = BookingService.find_cheapest_stays(
+            {self.seaside.id: Decimal('100.00')}, self.start, self.day(10), 2, limit=20
+        )[self.seaside.id]
+
+        # Starts 1-3 would overlap the booked nights 2-3
+        self.assertEqual(sorted((stay['check_in'] - self.start).days for stay in stays), [0, 4, 5, 6, 7, 8])
+
+    def test_result_limits(self):
+        self.assertEqual(len(self.search(results=1).json()['rooms'][0]['stays']), 1)
+        rooms = self.search(days=30, results=50).json()['rooms']
+        self.assertEqual([len(room['stays']) for room in rooms], [10, 10])
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in ({'nights': 0}, {'nights': 31}, {'nights': 'two'}, {'days': 1}, {'days': 367}):
+            self.assertEqual(self.search(**params).status_code, 400, params)
+        self.assertEqual(self.client.get('/api/rooms/flexible-search/', {'nights': 2}).status_code, 400)
+        self.assertEqual(self.search(window_start='soon').status_code, 400)
+
+
+class RoomSearchTests(TestCase):
+    """?q= full-text search over the FTS5 index"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.harbour = Room.objects.create(
+            name='Harbour Suite', description='Wide windows over the marina.',
+            special_perks='Private balcony', base_price_per_night=Decimal('300.00')
+        )
+        self.garden = Room.objects.create(
+            name='Garden Room', description='Quiet room facing the harbour gardens.',
+            bathroom_features='Rain shower, bathrobes', base_price_per_night=Decimal('150.00')
+        )
+        Room.objects.create(name='Attic', description='Cosy loft.', base_price_per_night=Decimal('90.00'))
+
+    def search(self, query):
+        cache.clear()  # Generations are bumped on commit, which TestCase never reaches
+        return [room['id'] for room in self.client.get('/api/rooms/', {'q': query}).json()['results']]
+
+    def test_ranks_name_matches_first(self):
+        self.assertEqual(self.search('harbour'), [self.harbour.id, self.garden.id])
+
+    def test_prefix_and_stemmed_matches(self):
+        self.assertEqual(self.search('balc'), [self.harbour.id])
+        self.assertEqual(self.search('bathrobe'), [self.garden.id])
+        self.assertEqual(self.search('quiet gardens'), [self.garden.id])
+
+    def test_search_and_stay_filter_run_once_per_request(self):
+        check_in = date.today() + timedelta(days=30)
+        query = {'q': 'harbour', 'check_in': check_in, 'check_out': check_in + timedelta(days=2)}
+        for path in ('/api/rooms/', '/api/rooms/facets/'):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(path, query).status_code, 200)
+
+            statements = [query['sql'] for query in queries]
+            self.assertEqual(sum(' MATCH ' in sql for sql in statements), 1)
+            self.assertEqual(sum('room_nights' in sql for sql in statements), 1)
+
+    def test_operators_in_user_input_are_inert(self):
+        self.assertEqual(self.search('harbour" OR NEAR(attic) -'), [])
+        # No words at all: the search is ignored
+        self.assertEqual(len(self.search('*"()')), 3)
+
+    def test_index_follows_updates_and_deletes(self):
+        Room.objects.filter(id=self.garden.id).update(description='Overlooks the lighthouse.')
+        self.assertEqual(self.search('lighthouse'), [self.garden.id])
+        self.assertEqual(self.search('harbour'), [self.harbour.id])
+
+        self.harbour.delete()
+        self.assertEqual(self.search('harbour'), [])
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command('rebuild_room_search', '--recreate', stdout=out)
+
+        self.assertIn('Indexed 3 rooms', out.getvalue())
+        self.assertEqual(self.search('marina'), [self.harbour.id])
+
+
+class RoomFeatureMaskTests(TestCase):
+    """feature_mask mirrors the boolean feature columns and backs ?features="""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.plain = Room.objects.create(name='Plain', description='x', base_price_per_night=Decimal('80.00'))
+        self.balcony = Room.objects.create(
+            name='Balcony', description='x', base_price_per_night=Decimal('120.00'),
+            minibar=True, has_balcony=True
+        )
+        self.accessible = Room.objects.create(
+            name='Accessible', description='x', base_price_per_night=Decimal('120.00'),
+            minibar=True, has_balcony=True, accessible_bathroom=True
+        )
+
+    def feature_search(self, features):
+        return sorted(room['name'] for room in self.client.get('/api/rooms/', {'features': features}).json()['results'])
+
+    def test_save_maintains_mask(self):
+        self.assertEqual(self.balcony.feature_mask, Room.feature_bits(
+            [field for field in Room.FEATURE_FIELDS if getattr(self.balcony, field)]
+        ))
+
+        self.plain.minibar = True
+        self.plain.save(update_fields=['minibar'])
+        self.plain.refresh_from_db()
+        self.assertTrue(self.plain.feature_mask & Room.feature_bits(['minibar']))
+
+    def test_filter_requires_every_feature(self):
+        self.assertEqual(self.feature_search('minibar,has_balcony'), ['Accessible', 'Balcony'])
+        self.assertEqual(self.feature_search('minibar, has_balcony, accessible_bathroom'), ['Accessible'])
+        self.assertEqual(self.feature_search('wifi'), ['Accessible', 'Balcony', 'Plain'])
+
+    def test_unknown_feature_is_rejected(self):
+        response = self.client.get('/api/rooms/', {'features': 'minibar,jacuzzi'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('jacuzzi', response.json()['features'])
+
+    def test_backfill_command_fixes_bulk_updates(self):
+        Room.objects.filter(id=self.plain.id).update(has_kitchenette=True)
+        out = StringIO()
+
+        call_command('backfill_feature_masks', stdout=out)
+
+        self.assertIn('Updated 1 of 3 rooms', out.getvalue())
+        self.plain.refresh_from_db()
+        self.assertEqual(self.plain.feature_mask, self.plain.compute_feature_mask())
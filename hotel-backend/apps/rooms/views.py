@@ -1,17 +1,27 @@
-from rest_framework import viewsets, filters, status
+from rest_framework import viewsets, filters, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db import models
+from django.db import models, IntegrityError
 from apps.rooms.models import Room, Amenity, RoomImage, RoomAvailability
 from apps.rooms.serializers import (
-    RoomListSerializer, RoomDetailSerializer, AmenitySerializer,
+    RoomListSerializer, RoomPricedListSerializer, RoomDetailSerializer, AmenitySerializer,
     RoomCreateUpdateSerializer, RoomImageSerializer, RoomImageCreateSerializer,
     RoomAvailabilitySerializer
 )
 from apps.bookings.services import BookingService
+from apps.bookings.pricing import PricingEngine
+from apps.core.pagination import CursorOrPageNumberPagination
+from apps.core.bulk_images import BulkImageUpload
+from apps.core.cache import CachedResponseMixin, ConditionalGetMixin
+from apps.core.fast_serializers import FastListMixin
+from apps.core.fieldsets import SparseFieldsetViewMixin
+from apps.core.reorder import bulk_reorder
+from apps.rooms.fast_serializers import RoomListFastSerializer
+from apps.rooms.search import search_rooms
 from datetime import datetime
+from decimal import Decimal
 
 
 class IsAdminOrStaff(IsAuthenticated):
@@ -22,11 +32,20 @@ class IsAdminOrStaff(IsAuthenticated):
         return request.user.role in ['ADMIN', 'STAFF']
 
 
-class RoomViewSet(viewsets.ModelViewSet):
+class RoomViewSet(CachedResponseMixin, ConditionalGetMixin, FastListMixin, SparseFieldsetViewMixin,
+                  viewsets.ModelViewSet):
     """
     Public endpoints:
     - GET /api/rooms/ - List rooms (with filters)
+    - GET /api/rooms/?q=sea view balcony - Full-text search, ranked by relevance
+    - GET /api/rooms/?features=minibar,has_balcony - Rooms with all of the listed features
+    - GET /api/rooms/?check_in=&check_out=&with_prices=true - List rooms with the stay price
+      (ordering=total_price / -total_price sorts by it)
     - GET /api/rooms/{slug}/ - Get room details
+    - ?fields=id,name,... keeps only those fields; ?expand= (empty) renders amenities as ids
+    - GET /api/rooms/facets/ - Counts per room type, view, bed, feature and accessibility option
+      for the current filters (same query string as the list)
+    - GET /api/rooms/flexible-search/?window_start=&window_end=&nights= - Cheapest stays within a date window
 
     Admin endpoints (requires authentication):
     - POST /api/rooms/ - Create room
@@ -34,15 +53,43 @@ class RoomViewSet(viewsets.ModelViewSet):
     - DELETE /api/rooms/{id}/ - Delete room
     - POST /api/rooms/{id}/add_image/ - Add image to room
     - DELETE /api/rooms/{id}/remove_image/ - Remove image from room
+    - GET /api/rooms/calendar/?start=&end=[&encoding=rle] - Rooms x days availability matrix
     """
-    queryset = Room.objects.all().prefetch_related('images', 'amenities')
+    queryset = Room.objects.all()
     lookup_field = 'slug'
+    fast_serializer_class = RoomListFastSerializer
+    cache_actions = conditional_actions = ('list', 'retrieve', 'facets')
+    # Listings filter on stays and price them, so bookings and prices count too
+    cache_dependencies = (
+        'rooms.Room', 'rooms.RoomImage', 'rooms.Amenity', 'rooms.RoomAvailability',
+        'bookings.SeasonalPrice', 'bookings.Booking',
+    )
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['room_type', 'capacity', 'is_active']
     ordering_fields = ['base_price_per_night', 'created_at']
 
+    # Widest date range the calendar endpoint will build
+    MAX_CALENDAR_DAYS = 366
+
+    # Longest check_in/check_out stay the list filters on and prices
+    MAX_STAY_NIGHTS = 366
+
+    # Facet groups counted by the facets endpoint
+    FACET_CHOICE_FIELDS = ('room_type', 'view_type', 'bed_configuration')
+    FACET_FEATURE_FIELDS = (
+        'wifi', 'air_conditioning', 'tv', 'telephone', 'work_desk', 'storage', 'safe',
+        'minibar', 'coffee_maker', 'iron_board', 'has_balcony', 'is_soundproof',
+        'has_kitchenette', 'has_seating_area',
+    )
+    FACET_ACCESSIBILITY_FIELDS = ('wheelchair_accessible', 'accessible_bathroom')
+
+    # Limits for flexible_search
+    MAX_SEARCH_WINDOW_DAYS = 366
+    MAX_SEARCH_NIGHTS = 30
+    MAX_SEARCH_RESULTS = 10
+
     def get_permissions(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'facets', 'flexible_search']:
             return [IsAuthenticatedOrReadOnly()]
         return [IsAdminOrStaff()]
 
@@ -54,8 +101,32 @@ class RoomViewSet(viewsets.ModelViewSet):
         return RoomListSerializer
 
     def get_queryset(self):
+        # Built once per request: the conditional-GET validators, the list and
+        # facets all read it, and ?q= / the stay dates each cost a query
+        if getattr(self, '_rooms', None) is None:
+            self._rooms = self.build_queryset()
+        return self._rooms.all()
+
+    def build_queryset(self):
         queryset = super().get_queryset()
 
+        # Relations (and columns) are trimmed to what ?fields= / ?expand= ask for
+        if self.action == 'retrieve':
+            # Availability comes from the precomputed summary joined in here
+            queryset = self.trim_queryset(
+                queryset,
+                select_related=['availability_summary'],
+                prefetch_related=['images', 'amenities']
+            )
+        else:
+            # Listings embed at most RoomListSerializer.IMAGE_LIMIT images per room;
+            # list() reads the base price for stay quotes
+            queryset = self.trim_queryset(
+                queryset,
+                prefetch_related=[RoomListSerializer.images_prefetch(), 'amenities'],
+                required=['base_price_per_night']
+            )
+
         # For public, only show active rooms
         if not (self.request.user and self.request.user.is_authenticated
                 and self.request.user.role in ['ADMIN', 'STAFF']):
@@ -70,24 +141,256 @@ class RoomViewSet(viewsets.ModelViewSet):
         if max_price:
             queryset = queryset.filter(base_price_per_night__lte=max_price)
 
+        # Rooms with every listed feature: a single bitwise test on feature_mask
+        features = self.request.query_params.get('features')
+        if features:
+            names = [name.strip() for name in features.split(',') if name.strip()]
+            unknown = sorted(set(names) - set(Room.FEATURE_FIELDS))
+            if unknown:
+                raise serializers.ValidationError({
+                    'features': f"Unknown features: {', '.join(unknown)}. Choose from: {', '.join(Room.FEATURE_FIELDS)}"
+                })
+            required_mask = Room.feature_bits(names)
+            queryset = queryset.alias(
+                matched_features=models.F('feature_mask').bitand(required_mask)
+            ).filter(matched_features=required_mask)
+
+        # Full-text search over name, description, perks and bathroom features, best match first
+        search = self.request.query_params.get('q')
+        if search:
+            queryset = search_rooms(queryset, search)
+
         # Filter by availability
+        stay = self.get_stay_dates()
+
+        if stay:
+            available_rooms = BookingService.get_available_rooms(*stay)
+            queryset = queryset.filter(id__in=list(available_rooms.values_list('id', flat=True)))
+
+        return queryset
+
+    def get_stay_dates(self):
+        """Parsed (check_in, check_out) from the query string, or None"""
+        if not hasattr(self, '_stay'):
+            self._stay = self.parse_stay_dates()
+        return self._stay
+
+    def parse_stay_dates(self):
         check_in = self.request.query_params.get('check_in')
         check_out = self.request.query_params.get('check_out')
+        if not (check_in and check_out):
+            return None
+        try:
+            check_in_date = datetime.strptime(check_in, '%Y-%m-%d').date()
+            check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
+        except ValueError:
+            return None
+        if (check_out_date - check_in_date).days > self.MAX_STAY_NIGHTS:
+            raise serializers.ValidationError({
+                'check_out': f'Stays are limited to {self.MAX_STAY_NIGHTS} nights'
+            })
+        return check_in_date, check_out_date
+
+    def list(self, request, *args, **kwargs):
+        stay = self.get_stay_dates()
+        ordering = request.query_params.get('ordering', '').split(',')[0].strip()
+        sort_by_price = ordering in ('total_price', '-total_price')
+        with_prices = request.query_params.get('with_prices', '').lower() in ('1', 'true', 'yes')
+
+        if stay is None or stay[1] <= stay[0] or not (with_prices or sort_by_price):
+            return super().list(request, *args, **kwargs)
+
+        check_in, check_out = stay
+        queryset = self.filter_queryset(self.get_queryset())
+
+        if sort_by_price:
+            # Total every matching room so the sort covers the whole result set;
+            # only the returned page keeps its nightly breakdown
+            base_prices = dict(queryset.values_list('id', 'base_price_per_night'))
+            engine = PricingEngine.load(base_prices.keys(), check_in, check_out, base_prices=base_prices)
+            totals = {room_id: engine.quote(room_id, check_in, check_out).total_cents for room_id in base_prices}
+            room_ids = sorted(base_prices, key=totals.__getitem__, reverse=ordering.startswith('-'))
+            page_ids = self.paginate_queryset(room_ids)
+            rooms_by_id = queryset.in_bulk(page_ids if page_ids is not None else room_ids)
+            rooms = [rooms_by_id[room_id] for room_id in (page_ids if page_ids is not None else room_ids)]
+            quotes = {room.id: engine.quote(room.id, check_in, check_out) for room in rooms}
+        else:
+            page = self.paginate_queryset(queryset)
+            rooms = list(page if page is not None else queryset)
+            base_prices = {room.id: room.base_price_per_night for room in rooms}
+            engine = PricingEngine.load(base_prices.keys(), check_in, check_out, base_prices=base_prices)
+            quotes = {room.id: engine.quote(room.id, check_in, check_out) for room in rooms}
+            page_ids = page
+
+        serializer = RoomPricedListSerializer(
+            rooms, many=True, context={**self.get_serializer_context(), 'quotes': quotes},
+            **self.get_sparse_kwargs()
+        )
+        if page_ids is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Counts per filter value for the rooms matching the current filters
+        (the same query string as the list, including price and stay dates),
+        all from a single conditional-aggregation query.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+
+        aggregates = {'total': models.Count('id')}
+        for field in self.FACET_CHOICE_FIELDS:
+            for value, _ in Room._meta.get_field(field).choices:
+                aggregates[f'{field}:{value}'] = models.Count('id', filter=models.Q(**{field: value}))
+        for field in self.FACET_FEATURE_FIELDS + self.FACET_ACCESSIBILITY_FIELDS:
+            aggregates[f'{field}:true'] = models.Count('id', filter=models.Q(**{field: True}))
+        counts = queryset.order_by().aggregate(**aggregates)
+
+        def choice_facet(field):
+            return [
+                {'value': value, 'label': str(label), 'count': counts[f'{field}:{value}']}
+                for value, label in Room._meta.get_field(field).choices
+            ]
+
+        def boolean_facet(fields):
+            return [
+                {'field': field, 'label': str(Room._meta.get_field(field).verbose_name),
+                 'count': counts[f'{field}:true']}
+                for field in fields
+            ]
 
-        if check_in and check_out:
-            try:
-                check_in_date = datetime.strptime(check_in, '%Y-%m-%d').date()
-                check_out_date = datetime.strptime(check_out, '%Y-%m-%d').date()
+        return Response({
+            'total': counts['total'],
+            **{field: choice_facet(field) for field in self.FACET_CHOICE_FIELDS},
+            'features': boolean_facet(self.FACET_FEATURE_FIELDS),
+            'accessibility': boolean_facet(self.FACET_ACCESSIBILITY_FIELDS),
+        })
+
+    @action(detail=False, methods=['get'], url_path='flexible-search')
+    def flexible_search(self, request):
+        """
+        Find the cheapest available start dates per room for a stay of `nights`
+        nights anywhere between window_start and window_end (latest check-out).
+        Accepts the usual room filters plus guests (minimum capacity) and
+        results (options per room, default 3).
+        """
+        window_start = request.query_params.get('window_start')
+        window_end = request.query_params.get('window_end')
+        nights = request.query_params.get('nights')
+
+        if not all([window_start, window_end, nights]):
+            return Response(
+                {'error': 'window_start, window_end and nights are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-                available_rooms = BookingService.get_available_rooms(
-                    check_in_date,
-                    check_out_date
-                )
-                queryset = queryset.filter(id__in=available_rooms.values_list('id', flat=True))
-            except ValueError:
-                pass
+        try:
+            window_start_date = datetime.strptime(window_start, '%Y-%m-%d').date()
+            window_end_date = datetime.strptime(window_end, '%Y-%m-%d').date()
+            nights = int(nights)
+            results = int(request.query_params.get('results', 3))
+            guests = int(request.query_params.get('guests', 0))
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format or number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        return queryset
+        window_days = (window_end_date - window_start_date).days
+        if not 1 <= nights <= self.MAX_SEARCH_NIGHTS:
+            return Response(
+                {'error': f'nights must be between 1 and {self.MAX_SEARCH_NIGHTS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if window_days < nights or window_days > self.MAX_SEARCH_WINDOW_DAYS:
+            return Response(
+                {'error': f'The window must fit the stay and span at most {self.MAX_SEARCH_WINDOW_DAYS} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        results = min(max(results, 1), self.MAX_SEARCH_RESULTS)
+
+        rooms = self.filter_queryset(self.get_queryset())
+        if guests:
+            rooms = rooms.filter(capacity__gte=guests)
+        rooms = list(rooms.values_list('id', 'name', 'slug', 'base_price_per_night'))
+
+        stays = BookingService.find_cheapest_stays(
+            {room_id: base_price for room_id, _, _, base_price in rooms},
+            window_start_date,
+            window_end_date,
+            nights,
+            limit=results
+        )
+
+        matches = [
+            {
+                'id': room_id,
+                'name': name,
+                'slug': slug,
+                'stays': [
+                    {
+                        'check_in': stay['check_in'].isoformat(),
+                        'check_out': stay['check_out'].isoformat(),
+                        'total_price': str(stay['total_price']),
+                    }
+                    for stay in stays[room_id]
+                ],
+            }
+            for room_id, name, slug, _ in rooms
+            if room_id in stays
+        ]
+        # Rooms with the cheapest option first
+        matches.sort(key=lambda match: Decimal(match['stays'][0]['total_price']))
+
+        return Response({
+            'window_start': window_start_date.isoformat(),
+            'window_end': window_end_date.isoformat(),
+            'nights': nights,
+            'rooms': matches,
+        })
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminOrStaff])
+    def calendar(self, request):
+        """
+        Availability matrix for the front desk / admin month grid.
+        Each room gets one status per day (free, booked, maintenance, blocked)
+        plus the booking id for booked days; encoding=rle returns
+        [status, length, booking_id] runs instead.
+        """
+        start = request.query_params.get('start')
+        end = request.query_params.get('end')
+
+        if not all([start, end]):
+            return Response(
+                {'error': 'start and end are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            start_date = datetime.strptime(start, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end, '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {'error': 'Invalid date format. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        days = (end_date - start_date).days + 1
+        if days < 1 or days > self.MAX_CALENDAR_DAYS:
+            return Response(
+                {'error': f'end must be on or after start and the range at most {self.MAX_CALENDAR_DAYS} days'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rooms = self.filter_queryset(self.get_queryset()).values_list('id', 'name', 'slug')
+        calendar = BookingService.build_availability_calendar(
+            rooms,
+            start_date,
+            end_date,
+            run_length=request.query_params.get('encoding') == 'rle'
+        )
+        return Response(calendar)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAdminOrStaff])
     def add_image(self, request, slug=None):
@@ -122,45 +425,10 @@ class RoomViewSet(viewsets.ModelViewSet):
     def bulk_add_images(self, request, slug=None):
         """Add multiple images to a room at once"""
         room = self.get_object()
-        images_data = []
-        errors = []
-
-        # Handle multiple file uploads
-        files = request.FILES.getlist('images')  # For file uploads
-        urls = request.data.getlist('image_urls')  # For URL uploads
-
-        # Get starting order value (next highest order)
-        max_order = room.images.aggregate(models.Max('order'))['order__max'] or 0
-        current_order = max_order + 1
-
-        # Process file uploads
-        for idx, file in enumerate(files):
-            data = {
-                'room': room.id,
-                'image': file,
-                'order': current_order + idx
-            }
-            serializer = RoomImageCreateSerializer(data=data, context={'request': request})
-            if serializer.is_valid():
-                serializer.save()
-                images_data.append(serializer.data)
-            else:
-                errors.append({'file': file.name, 'errors': serializer.errors})
-
-        # Process URL uploads
-        for idx, url in enumerate(urls):
-            if url:  # Skip empty URLs
-                data = {
-                    'room': room.id,
-                    'image_url': url,
-                    'order': current_order + len(files) + idx
-                }
-                serializer = RoomImageCreateSerializer(data=data, context={'request': request})
-                if serializer.is_valid():
-                    serializer.save()
-                    images_data.append(serializer.data)
-                else:
-                    errors.append({'url': url, 'errors': serializer.errors})
+        created, errors = BulkImageUpload(
+            RoomImage, RoomImageCreateSerializer, parent_field='room', settle_primary=True
+        ).save(room, request.FILES.getlist('images'), request.data.getlist('image_urls'))
+        images_data = RoomImageCreateSerializer(created, many=True, context={'request': request}).data
 
         return Response({
             'success': images_data,
@@ -181,24 +449,7 @@ class RoomViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        updated_count = 0
-        errors = []
-
-        for item in image_orders:
-            image_id = item.get('id')
-            new_order = item.get('order')
-
-            if image_id is None or new_order is None:
-                errors.append({'error': 'Each item must have "id" and "order"', 'item': item})
-                continue
-
-            try:
-                image = RoomImage.objects.get(id=image_id, room=room)
-                image.order = new_order
-                image.save(update_fields=['order'])
-                updated_count += 1
-            except RoomImage.DoesNotExist:
-                errors.append({'error': 'Image not found', 'id': image_id})
+        updated_count, errors = bulk_reorder(room.images.all(), image_orders, 'Image not found')
 
         return Response({
             'updated': updated_count,
@@ -213,10 +464,11 @@ class RoomImageViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminOrStaff]
 
 
-class AmenityViewSet(viewsets.ModelViewSet):
+class AmenityViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """Amenity management endpoints"""
     queryset = Amenity.objects.all()
     serializer_class = AmenitySerializer
+    cache_dependencies = ('rooms.Amenity',)
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
@@ -232,9 +484,13 @@ class RoomAvailabilityViewSet(viewsets.ModelViewSet):
     - POST /api/room-availability/ - Create new busy period
     - PUT/PATCH /api/room-availability/{id}/ - Update busy period
     - DELETE /api/room-availability/{id}/ - Delete busy period
+
+    Lists use cursor pagination (follow `next`); send ?page=N for page numbers.
     """
     queryset = RoomAvailability.objects.select_related('room', 'booking')
     serializer_class = RoomAvailabilitySerializer
+    pagination_class = CursorOrPageNumberPagination
+    ordering = ('start_date', 'id')
     permission_classes = [IsAdminOrStaff]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['room', 'status']
@@ -259,4 +515,13 @@ class RoomAvailabilityViewSet(viewsets.ModelViewSet):
         return queryset
 
     def perform_create(self, serializer):
-        serializer.save(created_by=self.request.user)
+        try:
+            serializer.save(created_by=self.request.user)
+        except IntegrityError:
+            raise serializers.ValidationError('Room already has a booking or busy period during this time range')
+
+    def perform_update(self, serializer):
+        try:
+            serializer.save()
+        except IntegrityError:
+            raise serializers.ValidationError('Room already has a booking or busy period during this time range')
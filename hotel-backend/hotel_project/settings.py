@@ -73,10 +73,22 @@ WSGI_APPLICATION = 'hotel_project.wsgi.application'
 
 # Database
 # Using SQLite for development (can switch to PostgreSQL for production)
+# WAL lets readers run alongside the single writer, and IMMEDIATE transactions
+# take the write lock up front so concurrent bookings wait (up to `timeout`
+# seconds) instead of failing with "database is locked" mid-transaction.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+        },
+        'TEST': {
+            # File-backed so WAL mode and multi-threaded tests behave like production
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -113,6 +125,13 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are stored by content hash (media/content/ab/<sha256>.jpg), so
+# identical files are kept once and their URLs never change
+STORAGES = {
+    'default': {'BACKEND': 'apps.core.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -145,3 +164,52 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
+
+# Cache
+# CACHE_BACKEND selects where API responses and their invalidation
+# generations are kept. Writes bump the generation in this cache, so it must
+# be shared by every worker process that serves the API:
+#   file   - directory in CACHE_LOCATION, shared by workers on one host (default)
+#   db     - table in CACHE_LOCATION on the default database (run createcachetable)
+#   locmem - per process; only for a single-process server, since a write in
+#            one worker does not invalidate what the others have cached
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'sunlake'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'api_cache'),
+}
+CACHE_BACKEND, CACHE_DEFAULT_LOCATION = CACHE_BACKENDS[config('CACHE_BACKEND', default='file')]
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': config('CACHE_LOCATION', default=CACHE_DEFAULT_LOCATION),
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=5000, cast=int)},
+    }
+}
+# The test suite always uses a locmem cache (see hotel_project/test_runner.py)
+TEST_RUNNER = 'hotel_project.test_runner.TestRunner'
+
+# Seconds a cached public API response is kept (writes invalidate it earlier)
+API_CACHE_TIMEOUT = config('API_CACHE_TIMEOUT', default=600, cast=int)
+
+# Serve room and gallery listings from .values() rows instead of DRF
+# serializers (same JSON, less per-object work)
+FAST_LIST_SERIALIZERS = config('FAST_LIST_SERIALIZERS', default=False, cast=bool)
+
+# Image variants
+# Widths (px) of the resized WebP/JPEG copies made of every uploaded image
+IMAGE_VARIANT_WIDTHS = config('IMAGE_VARIANT_WIDTHS', default='320,640,1280', cast=Csv(int))
+# Worker processes rendering variants after an upload commits; 0 renders
+# inline, after the transaction but still inside the request
+IMAGE_VARIANT_WORKERS = config('IMAGE_VARIANT_WORKERS', default=2, cast=int)
+# Threads validating and storing the files of one bulk upload
+IMAGE_UPLOAD_WORKERS = config('IMAGE_UPLOAD_WORKERS', default=4, cast=int)
+
+# Resumable uploads (/api/uploads/)
+# Part files of uploads in progress
+UPLOAD_SESSION_DIR = config('UPLOAD_SESSION_DIR', default=str(BASE_DIR / 'uploads'))
+# Largest chunk accepted per PUT, and largest file, in bytes
+UPLOAD_CHUNK_MAX_SIZE = config('UPLOAD_CHUNK_MAX_SIZE', default=8 * 1024 * 1024, cast=int)
+UPLOAD_MAX_SIZE = config('UPLOAD_MAX_SIZE', default=200 * 1024 * 1024, cast=int)
+# Hours before an unfinished upload is removed by purge_upload_sessions
+UPLOAD_SESSION_TTL_HOURS = config('UPLOAD_SESSION_TTL_HOURS', default=24, cast=int)